@@ -1,9 +1,14 @@
+import argparse
 import re
 import logging
+from array import array
 from collections import defaultdict
-from typing import List, Tuple, Dict, Set, Optional, Any, Callable
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Tuple, Dict, Set, Optional, Any, Callable, Iterable, Iterator, Union
 import pymysql
-from pymysql.cursors import Cursor
+from pymysql.cursors import Cursor, DictCursor, SSCursor
+
+from db_session import get_connection
 
 # 配置日志
 logging.basicConfig(
@@ -12,11 +17,18 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# tb_document.id（doc_splite.py 写入的 uuid 字符串）
+DocumentId = str
+
 
 class NumberingError:
     """表示编号验证过程中的错误"""
 
-    def __init__(self, code: str, message: str, number: Optional[Tuple[int, ...]] = None, doc_id: Optional[int] = None):
+    # 全库验证时错误对象很多，不为每个对象分配 __dict__
+    __slots__ = ('code', 'message', 'number', 'doc_id')
+
+    def __init__(self, code: str, message: str, number: Optional[Tuple[int, ...]] = None,
+                 doc_id: Optional[DocumentId] = None):
         self.code = code
         self.message = message
         self.number = number
@@ -27,55 +39,168 @@ class NumberingError:
         return f"[{self.code}]{doc_info} {self.message}"
 
 
+NUMBER_PATTERN = re.compile(r'^(\d+(?:[.．]\s*\d+)*)')
+NUMBER_SEPARATOR_PATTERN = re.compile(r'\.\s*')
+
+
+class NumberingTable:
+    """
+    列式存储的编号列表，与 parse_numbering 返回的 dict 列表等价，可直接传给各 validate 函数
+
+    document_id 存在列表中（同一文档的各行引用同一个字符串对象）；各编号的层级数字依次拼接在 array('q') levels 中，
+    第 i 个编号为 levels[offsets[i]:offsets[i + 1]]，每个编号只占几个机器字而不是一个 dict 和一个元组；
+    个别层级超出 64 位的编号（如录入错误的超长数字）原样存为元组放在 overflow 中，验证结果与 dict 列表完全相同
+    """
+
+    __slots__ = ('doc_ids', 'offsets', 'levels', 'overflow')
+
+    def __init__(self):
+        self.doc_ids: List[DocumentId] = []
+        self.offsets = array('q', [0])
+        self.levels = array('q')
+        # 第 i 个编号 -> 编号元组（该编号在 levels 中不占位置）
+        self.overflow: Dict[int, Tuple[int, ...]] = {}
+
+    def append(self, doc_id: DocumentId, number: Tuple[int, ...]) -> None:
+        try:
+            self.levels.extend(array('q', number))
+        except OverflowError:
+            # array('q', ...) 在修改 levels 之前就失败，不会留下半条记录
+            self.overflow[len(self.doc_ids)] = tuple(number)
+        self.doc_ids.append(doc_id)
+        self.offsets.append(len(self.levels))
+
+    def __len__(self) -> int:
+        return len(self.doc_ids)
+
+    def number(self, i: int) -> Tuple[int, ...]:
+        if i in self.overflow:
+            return self.overflow[i]
+        return tuple(self.levels[self.offsets[i]:self.offsets[i + 1]])
+
+    def number_str(self, i: int) -> str:
+        return '.'.join(map(str, self.number(i)))
+
+    def __iter__(self) -> Iterator[Tuple[DocumentId, Tuple[int, ...]]]:
+        """逐个产出 (document_id, 编号元组)"""
+        levels, offsets, overflow = self.levels, self.offsets, self.overflow
+        for i, doc_id in enumerate(self.doc_ids):
+            if overflow and i in overflow:
+                yield doc_id, overflow[i]
+            else:
+                yield doc_id, tuple(levels[offsets[i]:offsets[i + 1]])
+
+    def document_slices(self) -> Iterator[Tuple[DocumentId, int, int]]:
+        """按连续相同的 document_id 分段，产出 (document_id, start, stop)"""
+        start = 0
+        for i in range(1, len(self.doc_ids) + 1):
+            if i == len(self.doc_ids) or self.doc_ids[i] != self.doc_ids[start]:
+                yield self.doc_ids[start], start, i
+                start = i
+
+    def slice(self, start: int, stop: int) -> 'NumberingTable':
+        """第 start 到 stop - 1 个编号组成的新表"""
+        table = NumberingTable()
+        table.doc_ids = self.doc_ids[start:stop]
+        base = self.offsets[start]
+        table.levels = self.levels[base:self.offsets[stop]]
+        table.offsets = array('q', (offset - base for offset in self.offsets[start:stop + 1]))
+        table.overflow = {i - start: number for i, number in self.overflow.items() if start <= i < stop}
+        return table
+
+
+# parse_numbering 的 dict 列表或 NumberingTable
+Numbering = Union[List[Dict[str, Any]], NumberingTable]
+
+
+def _iter_numbers(numbering: Numbering) -> Iterator[Tuple[DocumentId, Tuple[int, ...]]]:
+    if isinstance(numbering, NumberingTable):
+        return iter(numbering)
+    return ((item['document_id'], item['number_tuple']) for item in numbering)
+
+
+def parse_catalog_number(doc_id: DocumentId,
+                         catalog_name: str) -> Tuple[Optional[Dict[str, Any]], Optional[NumberingError]]:
+    """解析一条目录名称中的编号，返回 (编号信息, None) 或 (None, 错误)"""
+    levels, error = parse_catalog_levels(doc_id, catalog_name)
+    if error is not None:
+        return None, error
+    return {
+        'document_id': doc_id,
+        'catalog_name': catalog_name,
+        'number_tuple': levels,
+        'number_str': '.'.join(map(str, levels))
+    }, None
+
+
+def parse_catalog_levels(doc_id: DocumentId,
+                         catalog_name: str) -> Tuple[Optional[Tuple[int, ...]], Optional[NumberingError]]:
+    """解析一条目录名称中的编号，返回 (编号元组, None) 或 (None, 错误)"""
+    content = catalog_name.strip()
+    match = NUMBER_PATTERN.match(content)
+    if not match:
+        return None, NumberingError("PARSE001", f"无法在内容中找到编号: '{content}'", None, doc_id)
+
+    number_str = match.group(1).strip()
+    number_str = number_str.replace('．', '.').replace('\u3000', ' ')
+    number_str = NUMBER_SEPARATOR_PATTERN.sub('.', number_str)
+
+    parts = [p.strip() for p in number_str.split('.') if p.strip()]
+    try:
+        levels = [int(p) for p in parts]
+    except ValueError:
+        return None, NumberingError("PARSE002",
+                                    f"格式错误：无法解析编号 '{number_str}'（包含非数字字符）", tuple(parts), doc_id)
+
+    if not levels:
+        return None, NumberingError("PARSE003", f"解析后的编号为空: '{number_str}'", None, doc_id)
+
+    return tuple(levels), None
+
+
 def parse_numbering(lines: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[NumberingError]]:
     """解析每行数据中的编号结构，返回包含编号信息的列表和错误列表。"""
-    numbering_list: List[Dict[str, Any]] = []
-    errors: List[NumberingError] = []
+    return _collect_parsed(parse_catalog_number(line['document_id'], line['catalog_name']) for line in lines)
 
-    for line in lines:
-        doc_id = line['document_id']
-        content = line['catalog_name'].strip()
-        match = re.match(r'^(\d+(?:[.．]\s*\d+)*)', content)
-        if not match:
-            errors.append(NumberingError("PARSE001", f"无法在内容中找到编号: '{content}'", None, doc_id))
-            continue
 
-        number_str = match.group(1).strip()
-        number_str = number_str.replace('．', '.').replace('\u3000', ' ')
-        number_str = re.sub(r'\.\s*', '.', number_str)
+def parse_numbering_table(rows: Iterable[Any], id_key: Any = 'document_id', name_key: Any = 'catalog_name',
+                          table: Optional[NumberingTable] = None) -> Tuple[NumberingTable, List[NumberingError]]:
+    """
+    与 parse_numbering 相同，但结果存入 NumberingTable（传入 table 时追加到该表）；
+    元组行（iter_catalog_rows）传 id_key=0, name_key=2
+    """
+    if table is None:
+        table = NumberingTable()
+    errors: List[NumberingError] = []
+    for row in rows:
+        doc_id = row[id_key]
+        levels, error = parse_catalog_levels(doc_id, row[name_key])
+        if error is None:
+            table.append(doc_id, levels)
+        else:
+            errors.append(error)
+    return table, errors
 
-        parts = [p.strip() for p in number_str.split('.') if p.strip()]
-        try:
-            levels = [int(p) for p in parts]
-        except ValueError:
-            errors.append(NumberingError("PARSE002",
-                                         f"格式错误：无法解析编号 '{number_str}'（包含非数字字符）", tuple(parts), doc_id))
-            continue
-
-        if not levels:
-            errors.append(NumberingError("PARSE003", f"解析后的编号为空: '{number_str}'", None, doc_id))
-            continue
-
-        numbering_list.append({
-            'document_id': doc_id,
-            'catalog_name': line['catalog_name'],
-            'number_tuple': tuple(levels),
-            'number_str': '.'.join(map(str, levels))
-        })
 
+def _collect_parsed(results) -> Tuple[List[Dict[str, Any]], List[NumberingError]]:
+    numbering_list: List[Dict[str, Any]] = []
+    errors: List[NumberingError] = []
+    for item, error in results:
+        if error is None:
+            numbering_list.append(item)
+        else:
+            errors.append(error)
     return numbering_list, errors
 
 
-def validate_parent_existence(numbering_list: List[Dict[str, Any]]) -> List[NumberingError]:
+def validate_parent_existence(numbering_list: Numbering) -> List[NumberingError]:
     """验证每个子编号的父编号是否存在"""
     errors: List[NumberingError] = []
-    doc_numbers: Dict[int, Set[Tuple[int, ...]]] = defaultdict(set)
-    for item in numbering_list:
-        doc_numbers[item['document_id']].add(item['number_tuple'])
+    doc_numbers: Dict[DocumentId, Set[Tuple[int, ...]]] = defaultdict(set)
+    for doc_id, number in _iter_numbers(numbering_list):
+        doc_numbers[doc_id].add(number)
 
-    for item in numbering_list:
-        number = item['number_tuple']
-        doc_id = item['document_id']
+    for doc_id, number in _iter_numbers(numbering_list):
         if len(number) > 1:
             parent = number[:-1]
             if parent not in doc_numbers[doc_id]:
@@ -84,14 +209,12 @@ def validate_parent_existence(numbering_list: List[Dict[str, Any]]) -> List[Numb
     return errors
 
 
-def validate_children(numbering_list: List[Dict[str, Any]]) -> List[NumberingError]:
+def validate_children(numbering_list: Numbering) -> List[NumberingError]:
     """验证子编号的连续性、唯一性和合法性"""
     errors: List[NumberingError] = []
-    doc_parent_children: Dict[int, Dict[Tuple[int, ...], List[int]]] = defaultdict(lambda: defaultdict(list))
+    doc_parent_children: Dict[DocumentId, Dict[Tuple[int, ...], List[int]]] = defaultdict(lambda: defaultdict(list))
 
-    for item in numbering_list:
-        doc_id = item['document_id']
-        number = item['number_tuple']
+    for doc_id, number in _iter_numbers(numbering_list):
         parent = number[:-1] if len(number) > 1 else tuple()
         doc_parent_children[doc_id][parent].append(number[-1])
 
@@ -106,29 +229,53 @@ def validate_children(numbering_list: List[Dict[str, Any]]) -> List[NumberingErr
                                              f"结构错误：父编号 {parent} 下没有子编号", parent, doc_id))
                 continue
 
-            unique_children = list(set(children))
-            if len(unique_children) < len(children):
-                duplicates = [x for x in unique_children if children.count(x) > 1]
+            # 排序后一次扫描：相邻相等为重复，相邻差大于 1 为缺失区间，不展开缺失的编号
+            duplicates: List[int] = []
+            missing_ranges: List[Tuple[int, int]] = []
+            previous = None
+            for child in sorted(children):
+                if child == previous:
+                    if not duplicates or duplicates[-1] != child:
+                        duplicates.append(child)
+                    continue
+                expected = 1 if previous is None else previous + 1
+                if child > expected:
+                    missing_ranges.append((max(expected, 1), child - 1))
+                previous = child
+
+            if duplicates:
                 errors.append(NumberingError("VALID003",
                                              f"结构错误：父编号 {parent} 下存在重复编号：{duplicates}", parent, doc_id))
 
-            invalid = [c for c in unique_children if c <= 0]
+            invalid = [c for c in children if c <= 0]
             if invalid:
+                invalid = sorted(set(invalid))
                 errors.append(NumberingError("VALID004",
                                              f"结构错误：父编号 {parent} 下存在非法编号（必须大于0）：{invalid}", parent,
                                              doc_id))
                 continue
 
-            children_sorted = sorted(unique_children)
-            expected = list(range(1, children_sorted[-1] + 1))
-            if children_sorted != expected:
-                missing = sorted(set(expected) - set(children_sorted))
+            if missing_ranges:
                 errors.append(NumberingError("VALID005",
-                                             f"结构错误：父编号 {parent} 下编号不连续，缺少：{missing}", parent, doc_id))
+                                             f"结构错误：父编号 {parent} 下编号不连续，缺少：{format_ranges(missing_ranges)}",
+                                             parent, doc_id))
     return errors
 
 
-def validate_numbering(numbering_list: List[Dict[str, Any]]) -> List[NumberingError]:
+# 编号不连续时最多列出的缺失区间数
+MAX_MISSING_RANGES = 10
+
+
+def format_ranges(ranges: List[Tuple[int, int]], limit: int = MAX_MISSING_RANGES) -> str:
+    """把 [(5, 5), (7, 99998)] 格式化为 '5, 7–99998'，超过 limit 个区间时截断并注明总数"""
+    text = ', '.join(str(start) if start == end else f"{start}–{end}" for start, end in ranges[:limit])
+    if len(ranges) > limit:
+        total = sum(end - start + 1 for start, end in ranges)
+        text += f" 等 {len(ranges)} 个区间（共缺少 {total} 个编号）"
+    return text
+
+
+def validate_numbering(numbering_list: Numbering) -> List[NumberingError]:
     """验证编号结构，返回错误列表"""
     errors = []
     errors.extend(validate_parent_existence(numbering_list))
@@ -136,26 +283,34 @@ def validate_numbering(numbering_list: List[Dict[str, Any]]) -> List[NumberingEr
     return errors
 
 
-def get_db_config() -> Dict[str, Any]:
-    """获取数据库配置"""
-    return {
-        'host': '172.16.7.163',
-        'port': 13306,
-        'database': 'cxj',
-        'user': 'adp',
-        'password': 'R7#pL9@qS6!wN2',
-        'charset': 'utf8mb4',
-        'cursorclass': pymysql.cursors.DictCursor
-    }
+def validate_document_chunk(documents: NumberingTable) -> List[List[Tuple[Any, ...]]]:
+    """
+    进程池任务：验证一批文档的编号（NumberingTable，同一文档的编号连续存放）
 
+    为减少进程间传输，输入为几个 array，输出为元组；返回每个文档的错误 (code, message, number, doc_id) 列表，顺序与输入一致
+    """
+    results = []
+    for _, start, stop in documents.document_slices():
+        errors = validate_numbering(documents.slice(start, stop))
+        results.append([(e.code, e.message, e.number, e.doc_id) for e in errors])
+    return results
 
-def fetch_catalog_data() -> List[Dict[str, Any]]:
-    """从数据库获取目录数据，包含document_id和document_name"""
-    db_config = get_db_config()
-    try:
-        with pymysql.connect(**db_config) as conn:
-            with conn.cursor() as cursor:
-                query = """
+
+def validate_documents_parallel(documents: NumberingTable, workers: Optional[int] = None,
+                                docs_per_task: int = 50) -> List[List[NumberingError]]:
+    """在进程池中按批验证多个文档，返回每个文档的 NumberingError 列表，顺序与 documents 中的文档顺序一致"""
+    slices = list(documents.document_slices())
+    chunks = [documents.slice(slices[i][1], slices[min(i + docs_per_task, len(slices)) - 1][2])
+              for i in range(0, len(slices), docs_per_task)]
+    doc_errors: List[List[NumberingError]] = []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for chunk_result in executor.map(validate_document_chunk, chunks):
+            for errors in chunk_result:
+                doc_errors.append([NumberingError(*error) for error in errors])
+    return doc_errors
+
+
+CATALOG_QUERY = """
                 SELECT 
                     dc.document_id, 
                     d.document_name,
@@ -168,13 +323,64 @@ def fetch_catalog_data() -> List[Dict[str, Any]]:
                 ORDER BY 
                     dc.document_id, dc.inner_id
                 """
-                cursor.execute(query)
+
+
+def fetch_catalog_data() -> List[Dict[str, Any]]:
+    """从数据库获取目录数据，包含document_id和document_name"""
+    try:
+        # 数据库配置见 db_session 的 check_number
+        with get_connection('check_number') as conn:
+            with conn.cursor(DictCursor) as cursor:
+                cursor.execute(CATALOG_QUERY)
                 return cursor.fetchall()
     except pymysql.MySQLError as e:
         logger.error(f"数据库操作失败: {e}")
         raise
 
 
+def iter_catalog_rows(batch_size: int = 1000) -> Iterator[Tuple[Any, ...]]:
+    """
+    用 SSCursor（服务端游标）逐批读取目录数据，产出元组 (document_id, document_name, catalog_name, inner_id)
+
+    不缓存整个结果集，也不为每行构造 dict；读完前连接一直被占用
+    """
+    try:
+        with get_connection('check_number') as conn:
+            with conn.cursor(SSCursor) as cursor:
+                cursor.execute(CATALOG_QUERY)
+                while True:
+                    rows = cursor.fetchmany(batch_size)
+                    if not rows:
+                        break
+                    yield from rows
+    except pymysql.MySQLError as e:
+        logger.error(f"数据库操作失败: {e}")
+        raise
+
+
+def iter_document_groups(rows: Iterable[Any], id_key: Any = 'document_id',
+                         name_key: Any = 'document_name') -> Iterator[Tuple[DocumentId, str, List[Any]]]:
+    """
+    一次遍历按文档分组，逐个产出 (document_id, document_name, 该文档的行)
+
+    rows 须按 document_id 排序（fetch_catalog_data 的查询已 ORDER BY），一个文档的行结束即产出，不需要持有全部结果；
+    元组行（iter_catalog_rows）传 id_key=0, name_key=1
+    """
+    current_id = None
+    current_name = None
+    group: List[Any] = []
+    for row in rows:
+        if row[id_key] != current_id:
+            if group:
+                yield current_id, current_name, group
+            current_id = row[id_key]
+            current_name = row[name_key]
+            group = []
+        group.append(row)
+    if group:
+        yield current_id, current_name, group
+
+
 def extract_part_number(doc_name: str) -> int:
     """从文档名称中提取'第x部分'的数字x，无法提取时返回无穷大"""
     match = re.search(r'第(\d+)部分', doc_name)
@@ -183,46 +389,135 @@ def extract_part_number(doc_name: str) -> int:
     return float('inf')  # 无法提取时排在最后
 
 
-def main():
-    """主函数"""
+def log_document_result(doc_info: Dict[str, Any]) -> None:
+    """输出一个文档的验证结果"""
+    part_num = doc_info['part_num']
+    # 显示文档标题（包含部分编号）
+    part_info = f"第{part_num}部分 " if part_num != float('inf') else ""
+    logger.info(f"\n=== 开始处理{part_info}{doc_info['name']} (ID: {doc_info['id']}) ===")
+
+    # 输出当前文档的错误
+    doc_validation_errors = doc_info['errors']
+    if doc_validation_errors:
+        logger.warning(f"  ⚠️ 发现 {len(doc_validation_errors)} 个编号错误:")
+        for error in doc_validation_errors:
+            logger.warning(f"  - {error}")
+    else:
+        logger.info("  ✅ 该文档编号结构正确")
+
+
+def log_summary(parse_error_count: int, validation_error_count: int) -> None:
+    """输出全局统计"""
+    logger.info(f"\n验证完成，共发现 {validation_error_count} 个验证错误")
+
+    if parse_error_count or validation_error_count:
+        logger.warning(f"处理完成，共发现 {parse_error_count + validation_error_count} 个错误")
+    else:
+        logger.info("所有编号验证通过，结构正确")
+
+
+def main_stream(batch_size: int = 1000) -> None:
+    """
+    流式验证：SSCursor 逐批读取元组，每个文档的行结束后立即解析、验证并输出结果
+
+    内存只与最大的单个文档有关；结果按 document_id 顺序输出（不按'第x部分'排序），解析错误随所属文档输出
+    """
     try:
-        logger.info("开始获取文档目录数据...")
-        catalogs = fetch_catalog_data()
-        logger.info(f"成功获取 {len(catalogs)} 条目录数据")
+        logger.info("开始流式验证文档目录编号（按文档ID顺序）...")
+        row_count = 0
+        doc_count = 0
+        valid_count = 0
+        parse_error_count = 0
+        validation_error_count = 0
+
+        for doc_id, doc_name, rows in iter_document_groups(iter_catalog_rows(batch_size), 0, 1):
+            row_count += len(rows)
+            numbering, parse_errors = parse_numbering_table(rows, 0, 2)
+            parse_error_count += len(parse_errors)
+            for error in parse_errors:
+                logger.warning(error)
+            if not numbering:
+                continue
 
-        if not catalogs:
+            doc_count += 1
+            valid_count += len(numbering)
+            doc_info = {
+                'id': doc_id,
+                'name': doc_name,
+                'part_num': extract_part_number(doc_name),
+                'errors': validate_numbering(numbering)
+            }
+            validation_error_count += len(doc_info['errors'])
+            log_document_result(doc_info)
+
+        if not row_count:
             logger.info("没有找到目录数据，程序终止")
             return
 
-        logger.info("开始解析编号...")
-        numbering_list, parse_errors = parse_numbering(catalogs)
+        logger.info(f"共读取 {row_count} 条目录数据，验证 {doc_count} 个文档，"
+                    f"有效编号: {valid_count}, 解析错误: {parse_error_count}")
+        log_summary(parse_error_count, validation_error_count)
+
+    except Exception as e:
+        logger.error(f"程序执行失败: {e}", exc_info=True)
+
+
+def main(workers: Optional[int] = None, docs_per_task: int = 50, batch_size: int = 1000):
+    """
+    主函数
+
+    目录数据由 iter_catalog_rows 流式读取，按文档分组后逐个解析，不持有整个结果集；
+    workers 大于 1 时先解析全部文档，再由 workers 个进程并行验证（每个任务 docs_per_task 个文档），输出与串行相同
+    """
+    parallel = workers is not None and workers > 1
+    try:
+        logger.info("开始获取并解析文档目录数据...")
+        # 按文档分组，每个文档的行结束后立即解析并验证，只保留验证结果；并行模式下编号先存入同一个 NumberingTable，稍后统一验证
+        row_count = 0
+        parse_errors: List[NumberingError] = []
+        valid_count = 0
+        doc_infos = []
+        pending_documents = NumberingTable()
+        for doc_id, doc_name, rows in iter_document_groups(iter_catalog_rows(batch_size), 0, 1):
+            row_count += len(rows)
+            if parallel:
+                parsed_before = len(pending_documents)
+                _, errors = parse_numbering_table(rows, 0, 2, table=pending_documents)
+                numbering_count = len(pending_documents) - parsed_before
+            else:
+                numbering, errors = parse_numbering_table(rows, 0, 2)
+                numbering_count = len(numbering)
+            parse_errors.extend(errors)
+            if not numbering_count:
+                continue
+            valid_count += numbering_count
+            doc_infos.append({
+                'id': doc_id,
+                'name': doc_name,
+                'part_num': extract_part_number(doc_name),
+                'errors': None if parallel else validate_numbering(numbering)
+            })
+
+        if not row_count:
+            logger.info("没有找到目录数据，程序终止")
+            return
+        logger.info(f"成功获取 {row_count} 条目录数据")
+
+        if pending_documents:
+            logger.info(f"使用 {workers} 个进程并行验证 {len(doc_infos)} 个文档...")
+            for doc_info, errors in zip(doc_infos, validate_documents_parallel(pending_documents, workers,
+                                                                                docs_per_task)):
+                doc_info['errors'] = errors
+
         for error in parse_errors:
             logger.warning(error)
 
-        logger.info(f"解析完成，有效编号: {len(numbering_list)}, 解析错误: {len(parse_errors)}")
+        logger.info(f"解析完成，有效编号: {valid_count}, 解析错误: {len(parse_errors)}")
 
-        if not numbering_list:
+        if not valid_count:
             logger.error("没有找到有效的编号，程序终止")
             return
 
-        # 按文档ID分组
-        doc_numbering: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
-        for item in numbering_list:
-            doc_numbering[item['document_id']].append(item)
-
-        # 准备文档信息并按"第x部分"排序
-        doc_infos = []
-        for doc_id in doc_numbering:
-            doc_info = next((c for c in catalogs if c['document_id'] == doc_id), None)
-            if doc_info:
-                part_num = extract_part_number(doc_info['document_name'])
-                doc_infos.append({
-                    'id': doc_id,
-                    'name': doc_info['document_name'],
-                    'part_num': part_num,
-                    'numbering': doc_numbering[doc_id]
-                })
-
         # 按part_num排序，无法提取的排在最后
         doc_infos.sort(key=lambda x: x['part_num'])
 
@@ -230,39 +525,29 @@ def main():
 
         logger.info("开始验证编号结构（按'第x部分'排序）...")
 
-        # 按排序后的顺序处理每个文档
+        # 按排序后的顺序输出每个文档
         for doc_info in doc_infos:
-            doc_id = doc_info['id']
-            doc_name = doc_info['name']
-            part_num = doc_info['part_num']
-
-            # 显示文档标题（包含部分编号）
-            part_info = f"第{part_num}部分 " if part_num != float('inf') else ""
-            logger.info(f"\n=== 开始处理{part_info}{doc_name} (ID: {doc_id}) ===")
-
-            # 验证当前文档的编号
-            doc_validation_errors = validate_numbering(doc_info['numbering'])
-            total_validation_errors.extend(doc_validation_errors)
-
-            # 输出当前文档的错误
-            if doc_validation_errors:
-                logger.warning(f"  ⚠️ 发现 {len(doc_validation_errors)} 个编号错误:")
-                for error in doc_validation_errors:
-                    logger.warning(f"  - {error}")
-            else:
-                logger.info("  ✅ 该文档编号结构正确")
+            total_validation_errors.extend(doc_info['errors'])
+            log_document_result(doc_info)
 
-        # 输出全局统计
-        logger.info(f"\n验证完成，共发现 {len(total_validation_errors)} 个验证错误")
-
-        if parse_errors or total_validation_errors:
-            logger.warning(f"处理完成，共发现 {len(parse_errors) + len(total_validation_errors)} 个错误")
-        else:
-            logger.info("所有编号验证通过，结构正确")
+        log_summary(len(parse_errors), len(total_validation_errors))
 
     except Exception as e:
         logger.error(f"程序执行失败: {e}", exc_info=True)
 
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description='验证文档目录的编号结构')
+    parser.add_argument('--stream', action='store_true',
+                        help='用服务端游标流式读取，逐个文档验证并输出（按文档ID顺序，内存只与最大的文档有关）')
+    parser.add_argument('--batch-size', type=int, default=1000, help='每次从服务端游标读取的行数')
+    parser.add_argument('--workers', type=int, default=None, help='并行验证的进程数（大于 1 时启用，不能与 --stream 同用）')
+    parser.add_argument('--docs-per-task', type=int, default=50, help='--workers 时每个进程任务验证的文档数')
+    args = parser.parse_args()
+    if args.stream and args.workers is not None:
+        parser.error('--workers 不能与 --stream 同时使用')
+
+    if args.stream:
+        main_stream(args.batch_size)
+    else:
+        main(args.workers, args.docs_per_task, args.batch_size)
\ No newline at end of file
@@ -0,0 +1,290 @@
+#!/usr/bin/python
+# encoding: utf-8
+"""
+共享数据库会话层：按配置名（profile）提供连接池
+
+配置优先级（后者覆盖前者）：
+1. DEFAULT_PROFILES 中的默认值
+2. 配置文件（环境变量 DB_CONFIG_FILE 指定，默认为本目录下的 db_config.json），格式为 {"profile": {"host": ...}}
+3. 环境变量 DB_<PROFILE>_<KEY>，例如 DB_DOC_SPLITE_PASSWORD、DB_HANGTIAN_POOL_SIZE
+
+代码中只保存地址、库名和超时等默认值；user 和 password 必须由配置文件或环境变量提供（参考 db_config.example.json），
+缺少时 load_db_config 抛出 MissingCredentialsError
+
+同一进程内相同配置共用一个池；连接归还时不断开，再次取出时若空闲超过 health_check_interval 秒则先 ping 检查
+"""
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'db_config.json')
+
+# 各配置名共用的连接池参数
+POOL_DEFAULTS = {
+    'driver': 'mysql.connector',  # mysql.connector 或 pymysql
+    'charset': 'utf8mb4',
+    'pool_size': 5,
+    'pool_timeout': 30,  # 池中无空闲连接时最多等待的秒数
+    'connect_timeout': 10,
+    'read_timeout': None,  # 仅 pymysql 支持
+    'write_timeout': None,  # 仅 pymysql 支持
+    'health_check_interval': 30,  # 空闲超过该秒数的连接取出时先 ping
+}
+
+# 各脚本的连接地址（账号密码见 REQUIRED_KEYS）
+DEFAULT_PROFILES = {
+    # doc_splite.py 测试数据库
+    'doc_splite': {
+        'host': '172.16.2.61',
+        'port': 3366,
+        'database': 'cqj',
+        'auth_plugin': 'mysql_native_password',
+    },
+    # check_number.py
+    'check_number': {
+        'driver': 'pymysql',
+        'host': '172.16.7.163',
+        'port': 13306,
+        'database': 'cxj',
+    },
+    # hangtian/hangtian.py 测试数据库
+    'hangtian': {
+        'host': '172.16.2.61',
+        'port': 3366,
+        'database': 'jzd',
+    },
+    # mysql_table_analyzer.py / new_table_analyzer.py（Doris FE 的 MySQL 协议端口）
+    'dexp': {
+        'host': '10.60.2.187',
+        'port': 9030,
+        'database': 'dexpdb',
+    },
+}
+
+# 不提供默认值、必须由配置文件或环境变量给出的键
+REQUIRED_KEYS = ('user', 'password')
+
+_INT_KEYS = {'port', 'pool_size'}
+_FLOAT_KEYS = {'pool_timeout', 'connect_timeout', 'read_timeout', 'write_timeout', 'health_check_interval'}
+
+
+class PoolTimeoutError(RuntimeError):
+    """在 pool_timeout 内没有取到空闲连接"""
+
+
+class MissingCredentialsError(RuntimeError):
+    """配置文件和环境变量都没有提供账号或密码"""
+
+
+def _coerce(key, value):
+    if value is None:
+        return None
+    if key in _INT_KEYS | _FLOAT_KEYS and value == '':
+        # 数值项的空字符串表示不设置（如 DB_CHECK_NUMBER_READ_TIMEOUT=）；字符串项（如空密码）原样保留
+        return None
+    if key in _INT_KEYS:
+        return int(value)
+    if key in _FLOAT_KEYS:
+        return float(value)
+    return value
+
+
+def load_db_config(profile, config_file=None, **overrides):
+    """合并默认值、配置文件、环境变量和调用方参数，返回该配置名的完整配置"""
+    config = dict(POOL_DEFAULTS)
+    config.update(DEFAULT_PROFILES.get(profile, {}))
+
+    config_file = config_file or os.environ.get('DB_CONFIG_FILE', DEFAULT_CONFIG_FILE)
+    if os.path.exists(config_file):
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config.update(json.load(f).get(profile, {}))
+
+    prefix = f"DB_{profile.upper()}_"
+    for name, value in os.environ.items():
+        if name.startswith(prefix):
+            config[name[len(prefix):].lower()] = value
+
+    config.update(overrides)
+    missing = [key for key in REQUIRED_KEYS if config.get(key) is None]
+    if missing:
+        env_names = ', '.join(prefix + key.upper() for key in missing)
+        raise MissingCredentialsError(
+            f"数据库配置 '{profile}' 缺少 {', '.join(missing)}：请在 {config_file} 的 \"{profile}\" 中设置，"
+            f"或设置环境变量 {env_names}")
+    return {key: _coerce(key, value) for key, value in config.items()}
+
+
+def _connect(config):
+    """按配置中的 driver 建立一个新的原生连接"""
+    if config['driver'] == 'pymysql':
+        import pymysql
+        kwargs = {
+            'host': config['host'],
+            'port': config['port'],
+            'database': config['database'],
+            'user': config['user'],
+            'password': config['password'],
+            'charset': config['charset'],
+            'connect_timeout': config['connect_timeout'],
+            'read_timeout': config['read_timeout'],
+            'write_timeout': config['write_timeout'],
+        }
+        return pymysql.connect(**kwargs)
+
+    import mysql.connector
+    kwargs = {
+        'host': config['host'],
+        'port': config['port'],
+        'database': config['database'],
+        'user': config['user'],
+        'password': config['password'],
+        'charset': config['charset'],
+        'connection_timeout': config['connect_timeout'],
+    }
+    if config.get('auth_plugin'):
+        kwargs['auth_plugin'] = config['auth_plugin']
+    return mysql.connector.connect(**kwargs)
+
+
+class PooledConnection:
+    """池中连接的代理：除 close() 归还到池外，其余属性都转发给原生连接"""
+
+    def __init__(self, pool, raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise AttributeError(f"connection already returned to pool: {name}")
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    @property
+    def driver(self):
+        return self._pool.config['driver']
+
+    def prepared_cursor(self):
+        """服务端预处理语句游标（mysql.connector）；pymysql 不支持，返回普通游标"""
+        if self.driver == 'pymysql':
+            return self._raw.cursor()
+        return self._raw.cursor(prepared=True)
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool.release(raw)
+
+
+class ConnectionPool:
+    """线程安全的连接池，最多 pool_size 个连接"""
+
+    def __init__(self, config):
+        self.config = config
+        self._idle = queue.LifoQueue()  # (原生连接, 归还时间)
+        self._slots = threading.BoundedSemaphore(config['pool_size'])
+
+    def _is_healthy(self, raw, idle_since):
+        if time.monotonic() - idle_since < self.config['health_check_interval']:
+            return True
+        try:
+            if self.config['driver'] == 'pymysql':
+                raw.ping(reconnect=True)
+            else:
+                raw.ping(reconnect=True, attempts=1)
+            return True
+        except Exception as e:
+            logger.warning(f"连接健康检查失败，重新建立连接: {e}")
+            return False
+
+    def acquire(self):
+        """取出一个连接，返回 PooledConnection；调用其 close() 归还"""
+        if not self._slots.acquire(timeout=self.config['pool_timeout']):
+            raise PoolTimeoutError(f"{self.config['pool_timeout']} 秒内没有空闲的数据库连接")
+        try:
+            while True:
+                try:
+                    raw, idle_since = self._idle.get_nowait()
+                except queue.Empty:
+                    return PooledConnection(self, _connect(self.config))
+                if self._is_healthy(raw, idle_since):
+                    return PooledConnection(self, raw)
+                self._discard(raw)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, raw):
+        # 丢弃未提交的事务，避免下一个使用者看到半截数据
+        try:
+            raw.rollback()
+            self._idle.put((raw, time.monotonic()))
+        except Exception:
+            self._discard(raw)
+        finally:
+            self._slots.release()
+
+    def _discard(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        while True:
+            try:
+                raw, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(raw)
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(profile, **overrides):
+    """返回该配置的进程内共享连接池（同一配置只创建一次）"""
+    config = load_db_config(profile, **overrides)
+    key = (profile, tuple(sorted((k, str(v)) for k, v in config.items())))
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(config)
+        return _pools[key]
+
+
+def get_connection(profile, **overrides):
+    """从共享连接池取出一个连接，用完调用 close() 归还"""
+    return get_pool(profile, **overrides).acquire()
+
+
+@contextmanager
+def session(profile, **overrides):
+    """with session('doc_splite') as conn: ... 正常结束提交，出现异常回滚，最后归还连接"""
+    conn = get_connection(profile, **overrides)
+    try:
+        yield conn
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def close_all_pools():
+    with _pools_lock:
+        for pool in _pools.values():
+            pool.close_all()
+        _pools.clear()
@@ -3,11 +3,19 @@
 import json
 import re
 import os
-import mysql.connector
 from mysql.connector import Error
 import uuid
+import mmap
+import queue
+import tempfile
+from array import array
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
 from datetime import datetime
 
+from db_session import PoolTimeoutError, get_connection, get_pool
+from property_extractor import extract_properties
+
 
 # 读取JSON文件内容
 def read_json_file(file_path):
@@ -53,6 +61,128 @@ def count_string_in_md(file_path, target_string):
 
     return first_line_number
 
+# 超过该大小的 MD 文档改用 mmap 读取，不再把整个文档按行拆成字符串
+MMAP_THRESHOLD_BYTES = 64 * 1024 * 1024
+
+
+# 基于 mmap 的 MD 文档读取器：只保存每行的起始字节偏移量，按需解码单行或一段连续的行
+# 行的划分与 md_content.split('\n') 一致，\r\n 按文本模式读取的结果转换为 \n
+class MdMmapReader:
+    def __init__(self, file_path):
+        self._file = open(file_path, 'rb')
+        self._size = os.fstat(self._file.fileno()).st_size
+        # 空文件不能 mmap
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size else b''
+        self._offsets = array('q', [0])
+        pos = self._mm.find(b'\n')
+        while pos != -1:
+            self._offsets.append(pos + 1)
+            pos = self._mm.find(b'\n', pos + 1)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+        return False
+
+    def close(self):
+        if isinstance(self._mm, mmap.mmap):
+            self._mm.close()
+        self._file.close()
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def _line_end(self, index):
+        # 不包含行尾的 \n
+        return self._offsets[index + 1] - 1 if index + 1 < len(self._offsets) else self._size
+
+    def _decode(self, start, end):
+        return self._mm[start:end].decode('utf-8').replace('\r\n', '\n')
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('line index out of range')
+        return self._decode(self._offsets[index], self._line_end(index)).rstrip('\r')
+
+    def section(self, start, stop=None):
+        """等价于 '\n'.join(lines[start:stop])，只解码一次"""
+        start, stop, _ = slice(start, stop).indices(len(self))
+        if start >= stop:
+            return ''
+        return self._decode(self._offsets[start], self._line_end(stop - 1)).rstrip('\r')
+
+
+# 打开 MD 文档：小文件直接读成字符串，大文件返回 MdMmapReader，两者都可以传给 extract_content_from_md
+def open_md_content(file_path, mmap_threshold=MMAP_THRESHOLD_BYTES):
+    if os.path.getsize(file_path) >= mmap_threshold:
+        return MdMmapReader(file_path)
+    return read_md_file(file_path)
+
+
+# 标题行号索引：每个文档只构建一次，替代 count_string_in_md 反复打开、扫描文件
+# lines 可以是行列表，也可以是 MdMmapReader；后者把规范化后的行写入临时文件并 mmap，不占用进程内存
+class MdTitleIndex:
+    def __init__(self, lines, skip_lines=38):
+        # 与 count_string_in_md 一致：去除空格和全角空格，跳过前 skip_lines 行
+        self.line_count = len(lines)
+        self._skip_lines = skip_lines
+        # split('\n') 在文件以换行结尾时会多出一个空行，逐行读取文件时并没有这一行
+        search_end = len(lines)
+        if search_end and lines[search_end - 1] == '':
+            search_end -= 1
+        stripped_lines = (lines[i].replace(" ", "").replace("\u3000", "") for i in range(skip_lines, search_end))
+        # 拼接后整体查找，再通过行起始偏移量二分定位行号
+        self._offsets = array('q')
+        self._spool = None
+        if isinstance(lines, MdMmapReader):
+            self._spool = tempfile.TemporaryFile()
+            offset = 0
+            for line in stripped_lines:
+                data = line.encode('utf-8') + b'\n'
+                self._offsets.append(offset)
+                self._spool.write(data)
+                offset += len(data)
+            self._spool.flush()
+            self._text = mmap.mmap(self._spool.fileno(), 0, access=mmap.ACCESS_READ) if offset else b''
+        else:
+            stripped_lines = list(stripped_lines)
+            offset = 0
+            for line in stripped_lines:
+                self._offsets.append(offset)
+                offset += len(line) + 1
+            self._text = '\n'.join(stripped_lines)
+        # 规范化后的目标字符串 -> 首次出现的行号
+        self._first_line = {}
+
+    def close(self):
+        if self._spool is not None:
+            if isinstance(self._text, mmap.mmap):
+                self._text.close()
+            self._spool.close()
+
+    def find(self, target_string):
+        """返回目标字符串首次出现的行号（从1开始），未找到返回-1"""
+        target = target_string.replace(" ", "").replace("\u3000", "")
+        if target in self._first_line:
+            return self._first_line[target]
+        line_number = -1
+        if '\n' in target:
+            # 跨行的目标不可能命中单行，保持与逐行匹配相同的结果
+            pass
+        elif self._offsets:
+            pos = self._text.find(target.encode('utf-8') if self._spool is not None else target)
+            if pos != -1:
+                line_number = bisect_right(self._offsets, pos) + self._skip_lines
+        self._first_line[target] = line_number
+        return line_number
+
+
 # 获取md文档的最后一行
 def get_last_line_number(file_path):
     with open(file_path, 'r', encoding='utf-8') as f:
@@ -61,13 +191,16 @@ def get_last_line_number(file_path):
             line_count += 1
     return line_count
 
-# 从MD文档中提取内容
-def extract_content_from_md(md_file_path, md_content, json_data):
+# 从MD文档中提取内容，md_content 可以是字符串，也可以是 MdMmapReader
+def extract_content_from_md(md_file_path, md_content, json_data, title_index=None):
     extracted_content = []
     title_pattern1 = r'^\s*([\d.\s]+)\s*(.*?)分类编号[:：]'
     title_pattern2 = r'^\s*([\d.\s]+)\s*(.*?)(?:按照|按)\s*JT'
     title_pattern3 = r'^\s*([\d.\s]+)\s*(.*?)(?<!意)见\s*([^。\n]+)?[。]?$'
-    lines = md_content.split('\n')
+    lines = md_content if isinstance(md_content, MdMmapReader) else md_content.split('\n')
+    own_title_index = title_index is None
+    if own_title_index:
+        title_index = MdTitleIndex(lines)
     num_items = len(json_data)
     previous_line = -1
     # 上一标题的startline
@@ -83,7 +216,7 @@ def extract_content_from_md(md_file_path, md_content, json_data):
         if (content_temp in lines[start_line - 1]) and (start_line >= previous_line):
             start_line = current_item['start_line']
         else:
-            start_line = count_string_in_md(md_file_path, content_temp)
+            start_line = title_index.find(content_temp)
             if start_line == -1:  # 将0改成-1，没找到
                 start_line = current_item['start_line']
         end_line = start_line
@@ -120,10 +253,10 @@ def extract_content_from_md(md_file_path, md_content, json_data):
             if i + 1 == len(json_data):
                 next_start_line = get_last_line_number(md_file_path)
             else:
-                next_start_line = count_string_in_md(md_file_path, next_content)
-            content_between = '\n'.join(lines[start_line:next_start_line - 1])
+                next_start_line = title_index.find(next_content)
+            content_between = _join_lines(lines, start_line, next_start_line - 1)
         else:
-            content_between = '\n'.join(lines[start_line:])
+            content_between = _join_lines(lines, start_line)
 
         # 合并标题行额外内容和中间内容
         full_content = title_line_content
@@ -143,29 +276,93 @@ def extract_content_from_md(md_file_path, md_content, json_data):
         extracted_content.append(current_item)
         # 获取标题
 
+    if own_title_index:
+        title_index.close()
+    resolve_catalog_parents(extracted_content)
+    return extracted_content
+
 
+# '\n'.join(lines[start:stop])，MdMmapReader 直接从 mmap 中截取一段
+def _join_lines(lines, start, stop=None):
+    if isinstance(lines, MdMmapReader):
+        return lines.section(start, stop)
+    return '\n'.join(lines[start:stop])
+
+
+# 在内存中确定目录树：为每个条目分配 catalog_id，并用层级栈找到 parent_id
+# 与 calcute_parent_id 的规则一致：父目录是前面最近的一个 level - 1 的条目，一级目录的 parent_id 为 '-1'
+def resolve_catalog_parents(extracted_content):
+    # level_stack[level - 1] 保存该层级最近出现的 catalog_id
+    level_stack = []
+    for item in extracted_content:
+        level = item['level']
+        item['catalog_id'] = str(uuid.uuid4())
+        if level == 1:
+            item['parent_id'] = '-1'
+        elif len(level_stack) >= level - 1 and level_stack[level - 2] is not None:
+            item['parent_id'] = level_stack[level - 2]
+        else:
+            print(f"未找到上级目录: {item['content']}")
+            item['parent_id'] = None
+        while len(level_stack) < level:
+            level_stack.append(None)
+        level_stack[level - 1] = item['catalog_id']
     return extracted_content
 
 
-# 连接数据库
+# 连接数据库：从共享连接池取出连接（配置见 db_session 的 doc_splite），close() 时归还
 def connect_to_database():
     try:
-        connection = mysql.connector.connect(
-            host='172.16.2.61',
-            port=3366,
-            # 测试数据库
-            database='cqj',
-            user='root',
-            password='123456',
-            auth_plugin='mysql_native_password'
-        )
+        connection = get_connection('doc_splite')
         if connection.is_connected():
             print('Connected to MySQL database')
             return connection
-    except Error as e:
+    except (Error, PoolTimeoutError) as e:
         print(f'Error while connecting to MySQL: {e}')
 
 
+# inner_id 序列表：用单行计数器按文档原子地预留 inner_id 区间，替代并发下不安全的 get_max_inner_id
+# 表结构和初始值见 INNER_ID_SEQUENCE_DDL，需要事先执行；这里只检查，不在运行时修改库结构
+INNER_ID_SEQUENCE_DDL = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations',
+                                     'tb_document_inner_id_seq.sql')
+ER_NO_SUCH_TABLE = 1146
+
+
+class InnerIdSequenceMissing(RuntimeError):
+    """tb_document_inner_id_seq 不存在或未初始化"""
+
+
+def check_inner_id_sequence(connection):
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT next_id FROM tb_document_inner_id_seq WHERE id = 1")
+        row = cursor.fetchone()
+    except Error as e:
+        if e.errno != ER_NO_SUCH_TABLE:
+            raise
+        raise InnerIdSequenceMissing(
+            f'Table tb_document_inner_id_seq does not exist; run {INNER_ID_SEQUENCE_DDL} first') from e
+    finally:
+        cursor.close()
+    if row is None:
+        raise InnerIdSequenceMissing(
+            f'tb_document_inner_id_seq has no counter row (id = 1); run the INSERT in {INNER_ID_SEQUENCE_DDL}')
+
+
+# 预留 count 个连续的 inner_id，返回第一个；在独立的短事务中提交，保证多个写入连接之间不会重叠
+def reserve_inner_id_range(connection, count):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(
+            "UPDATE tb_document_inner_id_seq SET next_id = LAST_INSERT_ID(next_id + %s) WHERE id = 1", (count,))
+        cursor.execute("SELECT LAST_INSERT_ID()")
+        last_inner_id = int(cursor.fetchone()[0])
+        connection.commit()
+    finally:
+        cursor.close()
+    return last_inner_id - count + 1
+
+
 # 获取当前最大的 inner_id
 def get_max_inner_id(connection):
     try:
@@ -241,6 +438,205 @@ def insert_into_tb_document_property_content(connection, property_name, catalog_
         print(f'Error while inserting into tb_document_property_content: {e}')
 
 
+# 批量写入：按表缓存待插入的行，达到批大小后用 executemany 写入，每个文档只提交一次
+class DocumentBatchWriter:
+    # mysql.connector 的 executemany 会把 INSERT ... VALUES 改写为多行 VALUES 一次发送
+    TABLE_SQL = {
+        'tb_document': "INSERT INTO tb_document (id, document_name, file_id, file_path, creator_id, gmt_create) VALUES (%s, %s, %s, %s, %s, %s)",
+        'tb_document_catalog': "INSERT INTO tb_document_catalog (id, document_id, inner_id, catalog_name, parent_id, level, creator_id, gmt_create) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)",
+        'tb_document_catalog_content': "INSERT INTO tb_document_catalog_content (id, catalog_id, content, page_number, creator_id, gmt_create) VALUES (%s, %s, %s, %s, %s, %s)",
+        'tb_document_property_content': "INSERT INTO tb_document_property_content (id, property_name, catalog_id, content, creator_id, gmt_create) VALUES (%s, %s, %s, %s, %s, %s)",
+    }
+
+    def __init__(self, connection, batch_size=1000):
+        self.connection = connection
+        self.batch_size = batch_size
+        # 按 TABLE_SQL 的顺序刷新，保证父表的行先于子表写入
+        self.buffers = {table: [] for table in self.TABLE_SQL}
+        self.row_counts = {table: 0 for table in self.TABLE_SQL}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        # 正常结束则提交整个文档，出现异常则整体回滚，不留下插入一半的目录
+        if exc_type is None:
+            self.commit()
+        else:
+            self.rollback()
+        return False
+
+    def _add(self, table, values):
+        self.buffers[table].append(values)
+        if len(self.buffers[table]) >= self.batch_size:
+            self.flush()
+
+    def add_document(self, document_name, file_id, file_path, creator_id):
+        doc_id = str(uuid.uuid4())
+        self._add('tb_document', (doc_id, document_name, file_id, file_path, creator_id, datetime.now()))
+        return doc_id
+
+    def add_catalog(self, document_id, inner_id, catalog_name, parent_id, level, creator_id, catalog_id=None):
+        catalog_id = catalog_id or str(uuid.uuid4())
+        self._add('tb_document_catalog',
+                  (catalog_id, document_id, inner_id, catalog_name, parent_id, level, creator_id, datetime.now()))
+        return catalog_id
+
+    def add_catalog_content(self, catalog_id, content, page_number, creator_id):
+        content_id = str(uuid.uuid4())
+        self._add('tb_document_catalog_content',
+                  (content_id, catalog_id, content, page_number, creator_id, datetime.now()))
+        return content_id
+
+    def add_property_content(self, property_name, catalog_id, content, creator_id):
+        property_id = str(uuid.uuid4())
+        self._add('tb_document_property_content',
+                  (property_id, property_name, catalog_id, content, creator_id, datetime.now()))
+        return property_id
+
+    def flush(self):
+        """把所有缓存的行写入数据库（不提交）"""
+        cursor = self.connection.cursor()
+        try:
+            for table, sql in self.TABLE_SQL.items():
+                rows = self.buffers[table]
+                if rows:
+                    cursor.executemany(sql, rows)
+                    self.row_counts[table] += len(rows)
+                    self.buffers[table] = []
+        finally:
+            cursor.close()
+
+    def commit(self):
+        self.flush()
+        self.connection.commit()
+        for table, count in self.row_counts.items():
+            if count:
+                print(f"Inserted into {table}: {count} rows")
+        self.row_counts = {table: 0 for table in self.TABLE_SQL}
+
+    def rollback(self):
+        self.buffers = {table: [] for table in self.TABLE_SQL}
+        self.row_counts = {table: 0 for table in self.TABLE_SQL}
+        self.connection.rollback()
+        print('Rolled back uncommitted rows')
+
+
+# 解析单个文档并抽取目录、正文和属性（在进程池中运行，不访问数据库）
+def prepare_document(json_file_path, md_file_path):
+    json_data = read_json_file(json_file_path)
+    md_content = open_md_content(md_file_path)
+    try:
+        extracted_content = extract_content_from_md(md_file_path, md_content, json_data)
+    finally:
+        if isinstance(md_content, MdMmapReader):
+            md_content.close()
+    for item in extracted_content:
+        item['properties'] = extract_properties(item['full_content'])
+
+    # 解析文档名称
+    document_name = os.path.basename(md_file_path)
+    return document_name, extracted_content
+
+
+# 把一个已抽取的文档写入数据库，整个文档一个事务
+def write_document(connection, document_name, extracted_content, batch_size=1000):
+    # 预留 inner_id 区间
+    first_inner_id = reserve_inner_id_range(connection, len(extracted_content))
+
+    with DocumentBatchWriter(connection, batch_size) as writer:
+        document_id = writer.add_document(document_name, '文件存储ID', '文件存储路径', '创建人ID')
+        print(f"document_id={document_id}")
+
+        for index, item in enumerate(extracted_content):
+            inner_id = first_inner_id + index
+
+            # catalog_id 和 parent_id 已在 extract_content_from_md 中确定，无需再查询数据库
+            catalog_id = writer.add_catalog(
+                document_id,
+                inner_id,
+                item['content'].split('\n')[0].strip(),  # 使用第一行作为目录名称
+                item['parent_id'],
+                item['level'],
+                '创建人ID',
+                catalog_id=item['catalog_id']
+            )
+            writer.add_catalog_content(
+                catalog_id,
+                item['full_content'],
+                None,  # 假设没有页码信息
+                '创建人ID'
+            )
+            for prop in item['properties']:
+                writer.add_property_content(prop.name, catalog_id, prop.value, '创建人ID')
+    return document_id
+
+
+# 并行导入多个文档：进程池负责解析和抽取，writer_connections 个数据库连接负责写入
+# writer_connections 不能超过 doc_splite 连接池的 pool_size，超出时按 pool_size 处理
+def ingest_documents(file_pairs, workers=None, writer_connections=1, batch_size=1000):
+    if writer_connections < 1:
+        raise ValueError(f'writer_connections must be at least 1, got {writer_connections}')
+    pool_size = get_pool('doc_splite').config['pool_size']
+    if writer_connections > pool_size:
+        print(f'writer_connections={writer_connections} exceeds pool_size={pool_size}, using {pool_size}')
+        writer_connections = pool_size
+
+    connections = [connect_to_database() for _ in range(writer_connections)]
+    if not all(connections):
+        for connection in connections:
+            if connection:
+                connection.close()
+        print('Error: could not open all writer connections')
+        return []
+
+    try:
+        check_inner_id_sequence(connections[0])
+    except BaseException:
+        for connection in connections:
+            connection.close()
+        raise
+    idle_connections = queue.Queue()
+    for connection in connections:
+        idle_connections.put(connection)
+
+    def write_with_pooled_connection(document_name, extracted_content):
+        connection = idle_connections.get()
+        try:
+            return write_document(connection, document_name, extracted_content, batch_size)
+        finally:
+            idle_connections.put(connection)
+
+    document_ids = []
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as parsers, \
+                ThreadPoolExecutor(max_workers=writer_connections) as writers:
+            parse_futures = {parsers.submit(prepare_document, json_file_path, md_file_path): md_file_path
+                             for json_file_path, md_file_path in file_pairs}
+            write_futures = {}
+            for future in as_completed(parse_futures):
+                md_file_path = parse_futures[future]
+                try:
+                    document_name, extracted_content = future.result()
+                except Exception as e:
+                    print(f'Error while parsing {md_file_path}: {e}')
+                    continue
+                write_futures[writers.submit(write_with_pooled_connection, document_name, extracted_content)] = \
+                    document_name
+
+            for future in as_completed(write_futures):
+                document_name = write_futures[future]
+                try:
+                    document_ids.append(future.result())
+                except Error as e:
+                    # 整个文档已回滚
+                    print(f'Error while inserting {document_name}, rolled back: {e}')
+    finally:
+        for connection in connections:
+            connection.close()
+    return document_ids
+
+
 #
 def calcute_parent_id(connection, document_id, inner_id, level):
     try:
@@ -301,102 +697,4 @@ if __name__ == "__main__":
         r'./file2/交通信息基础数据元 第15部分：航标信息基础数据元(上传系统).md',
     ]
 
-    connection = connect_to_database()
-
-    for i in range(0, 100):
-        print(f"序号 {i + 1}:")
-        print(f"  json_file_path_arr 的元素: {json_file_path_arr[i]}")
-        print(f"  md_file_path 的元素: {md_file_path_arr[i]}")
-
-        json_file_path = json_file_path_arr[i]
-        md_file_path = md_file_path_arr[i]
-
-        json_data = read_json_file(json_file_path)
-        md_content = read_md_file(md_file_path)
-
-        extracted_content = extract_content_from_md(md_file_path, md_content, json_data)
-
-        if connection:
-            # 解析文档名称
-            document_name = os.path.basename(md_file_path)
-            document_id = insert_into_tb_document(connection, document_name, '文件存储ID', '文件存储路径', '创建人ID')
-            print(f"document_id={document_id}")
-
-            # 获取当前最大的 inner_id
-            max_inner_id = get_max_inner_id(connection)
-
-            # 初始化空
-            property_lable_set = set()
-
-            for index, item in enumerate(extracted_content):
-                inner_id = max_inner_id + index + 1
-                print(f'inner_id=${inner_id}')
-                parent_id = '-1' if item['level'] == 1 else calcute_parent_id(connection, document_id, inner_id,
-                                                                              item['level']).get('id')
-
-                catalog_id = insert_into_tb_document_catalog(
-                    connection,
-                    document_id,
-                    inner_id,
-                    item['content'].split('\n')[0].strip(),  # 使用第一行作为目录名称
-                    parent_id,  # 假设根目录的parent_id为None
-                    item['level'],
-                    '创建人ID'
-                )
-                insert_into_tb_document_catalog_content(
-                    connection,
-                    catalog_id,
-                    item['full_content'],
-                    None,  # 假设没有页码信息
-                    '创建人ID'
-                )
-
-                # 分析 full_content 并插入符合格式的数据到 tb_document_property_content 表
-                full_content = item['full_content'].replace('JT / T', 'JT/T')
-                # 定义属性模式和对应名称
-                property_patterns = [
-                    (r"分类编号[：:]\s*([A-Za-z0-9]+)", "分类编号"),
-                    (r"值域[: ：]\s*([^，。；\n]*)", "值域"),
-                    # 匹配了按和按照，但是以按照命名
-                    (r"(?:按照|按) JT/T ([^，。；\n]*)", "按照 JT/T"),
-                    (r"(?:按照|按)\s+(\d+(?:\.\s*\d+)+)", "按照 JT/T"),
-                    #按照本标准的4. 4. 1. 3
-                    (r"按照本标准的[^\d]*(?P<number>\d+(?:\.\s*\d+)*)", "按照本标准的"),
-                    (r"^见\s*([^，。；\n]*)", "见"),  # 添加^锚定行首，\s*要求"见"后有空格
-                #   匹配"注：同 JT / T 697. 2—2014 的 4. 1. 1. 1"
-                    (r"注[:：]同\s*JT/T\s*(\d+(?:\.\s*\d+)*—\d+\s*的\s*\d+(?:\.\s*\d+)*)", "注：同 JT/T"),
-                #   匹配[来源:JT/T 697.4—-2013,5.7.1.5.2]
-                    # 优化后的正则表达式，处理空格、连字符和多点分隔1
-                    # 优化后的正则表达式，允许编号后有额外内容
-                    (r"\[来源[:：]JT/T\s*(\d+(?:\s*\.\s*\d+)*[—-]\d+,\s*\d+(?:\s*\.\s*\d+)*(?:,\s*[^\]]+)?)\]","来源：JT/T")
-                ]
-
-                # 定义默认属性（当full_content为空时插入）
-                default_properties = [
-                    ("空", "空"),
-                    # 可以添加其他默认属性
-                ]
-
-                # 先处理默认属性（如果full_content为空）
-                if not full_content.strip():
-                    for prop_name, prop_value in default_properties:
-                        label = f"{catalog_id}###{prop_name}"
-                        if label not in property_lable_set:
-                            property_lable_set.add(label)
-                            insert_into_tb_document_property_content(
-                                connection, prop_name, catalog_id, prop_value, '创建人ID'
-                            )
-                else:
-                    # 原有正则匹配逻辑
-                    for pattern_regex, property_name in property_patterns:
-                        matches = re.findall(pattern_regex, full_content)
-                        for match in matches:
-                            property_value = match[0] if isinstance(match, tuple) else match
-                            label = f"{catalog_id}###{property_name}"
-                            if label not in property_lable_set:
-                                property_lable_set.add(label)
-                                insert_into_tb_document_property_content(
-                                    connection, property_name, catalog_id, property_value.strip(), '创建人ID'
-                                )
-
-    connection.close()
+    ingest_documents(list(zip(json_file_path_arr, md_file_path_arr)))
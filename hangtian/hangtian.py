@@ -1,5 +1,14 @@
+import argparse
+import asyncio
+import os
 import re
-import pymysql  # 或根据实际数据库类型调整
+import sqlite3
+import sys
+import time
+from collections import OrderedDict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_session import get_connection, load_db_config  # noqa: E402
 
 
 # 1. 读取文件并提取ID
@@ -10,19 +19,165 @@ def extract_ids(file_path):
     return re.findall(r'XD\d+', content)
 
 
+ID_PATTERN = re.compile(r'XD\d+')
+# 缓冲区末尾可能是一个尚未读完的ID（X、XD、XD123...），留到下一块再匹配
+ID_TAIL_PATTERN = re.compile(r'(?:XD\d*|X)$')
+
+
+# 1'. 流式读取文件并逐个产出ID，结果与 extract_ids 相同，适合数GB的导出文件
+# dedupe=True 时只产出第一次出现的ID，已出现的ID以整数形式保存（'1' + 数字部分，保留前导0）
+def iter_ids(file_path, chunk_size=1024 * 1024, dedupe=False):
+    seen = set() if dedupe else None
+    carry = ''
+    with open(file_path, 'r', encoding='utf-8') as f:
+        while True:
+            chunk = f.read(chunk_size)
+            buffer = carry + chunk
+            if chunk:
+                tail = ID_TAIL_PATTERN.search(buffer)
+                end = tail.start() if tail else len(buffer)
+            else:
+                # 文件结束，剩余内容全部匹配
+                end = len(buffer)
+            for match in ID_PATTERN.finditer(buffer, 0, end):
+                id_val = match.group(0)
+                if seen is not None:
+                    key = int('1' + id_val[2:])
+                    if key in seen:
+                        continue
+                    seen.add(key)
+                yield id_val
+            if not chunk:
+                return
+            carry = buffer[end:]
+
+
+# 把ID迭代器按 size 个一组切分，不需要预先读入全部ID
+def iter_chunks(ids, size):
+    chunk = []
+    for id_val in ids:
+        chunk.append(id_val)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# 批量模式中表示“已查询、数据库中不存在”的ID
+MISSING = object()
+
+# 批量查询时每条 IN (...) 的ID个数，需保证单条SQL不超过 max_allowed_packet
+CHUNK_SIZE = 1000
+
+# 批量模式在内存中保留的最近查询过的ID个数
+KNOWN_IDS_SIZE = 100000
+
+
+# 本地ID缓存：sale_order_sub_no -> flag_pos_3（包括不存在的ID），超过 ttl 秒视为过期，最多保留 max_entries 条
+# 多个进程可以同时使用同一个缓存文件：每次写入在一个 BEGIN IMMEDIATE 事务中完成，行数在该事务内统计
+class FlagCache:
+    # SQLite 单条语句的参数个数上限（旧版本为999）
+    MAX_SQL_VARIABLES = 900
+
+    def __init__(self, path, ttl=24 * 3600, max_entries=1000000, refresh=False):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # refresh=True 时忽略已有缓存，查询结果仍会写回
+        self.refresh = refresh
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+        # 自行管理事务（isolation_level=None），写锁被其他进程占用时最多等待 30 秒
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS id_cache ("
+            "sale_order_sub_no TEXT PRIMARY KEY, found INTEGER NOT NULL, flag_pos_3, fetched_at REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_id_cache_fetched_at ON id_cache (fetched_at)")
+
+    def close(self):
+        self.conn.close()
+
+    def get_many(self, ids):
+        """返回 (命中的 {ID: flag_pos_3}, 需要查询数据库的ID列表)；命中但不存在的ID不在字典中，但也不需要查询"""
+        unique_ids = list(dict.fromkeys(ids))
+        if self.refresh:
+            self.misses += len(unique_ids)
+            return {}, unique_ids
+
+        cached = {}
+        for start in range(0, len(unique_ids), self.MAX_SQL_VARIABLES):
+            chunk = unique_ids[start:start + self.MAX_SQL_VARIABLES]
+            placeholders = ', '.join(['?'] * len(chunk))
+            rows = self.conn.execute(
+                f"SELECT sale_order_sub_no, found, flag_pos_3, fetched_at FROM id_cache "
+                f"WHERE sale_order_sub_no IN ({placeholders})", chunk)
+            for sale_order_sub_no, found, flag, fetched_at in rows:
+                cached[sale_order_sub_no] = (found, flag, fetched_at)
+
+        expire_before = time.time() - self.ttl
+        flags = {}
+        to_fetch = []
+        for id_val in unique_ids:
+            entry = cached.get(id_val)
+            if entry is None:
+                self.misses += 1
+                to_fetch.append(id_val)
+            elif entry[2] < expire_before:
+                self.stale += 1
+                to_fetch.append(id_val)
+            else:
+                self.hits += 1
+                if entry[0]:
+                    flags[id_val] = entry[1]
+        return flags, to_fetch
+
+    def put_many(self, ids, flags):
+        """写入一组查询结果：ids 为本次查询的全部ID，flags 中没有的ID记为不存在"""
+        ids = list(dict.fromkeys(ids))
+        now = time.time()
+        # 立即取得写锁：其他进程的写入要么在本事务之前完成，要么等本事务提交，淘汰时看到的行数不会过时
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO id_cache (sale_order_sub_no, found, flag_pos_3, fetched_at) "
+                "VALUES (?, ?, ?, ?)",
+                [(id_val, int(id_val in flags), flags.get(id_val), now) for id_val in ids])
+            self._evict()
+            self.conn.execute("COMMIT")
+        except BaseException:
+            self.conn.execute("ROLLBACK")
+            raise
+
+    def _evict(self):
+        """在 put_many 的写事务中调用"""
+        size = self.conn.execute("SELECT COUNT(*) FROM id_cache").fetchone()[0]
+        if size <= self.max_entries:
+            return
+        # 先删过期的，再按写入时间删最旧的
+        size -= self.conn.execute("DELETE FROM id_cache WHERE fetched_at < ?", (time.time() - self.ttl,)).rowcount
+        if size > self.max_entries:
+            self.conn.execute(
+                "DELETE FROM id_cache WHERE sale_order_sub_no IN "
+                "(SELECT sale_order_sub_no FROM id_cache ORDER BY fetched_at LIMIT ?)",
+                (size - self.max_entries,))
+
+    def stats(self):
+        total = self.hits + self.misses + self.stale
+        hit_rate = self.hits / total * 100 if total else 0
+        return f"缓存命中 {self.hits}，未命中 {self.misses}，过期 {self.stale}，命中率 {hit_rate:.2f}%"
+
+
 # 2. 查询数据库并判断name字段
-def check_names_in_db(ids):
-    # 数据库连接配置（根据实际情况修改）
-    conn = pymysql.connect(
-        host='172.16.2.61',
-        port=3366,
-        # 测试数据库
-        database='jzd',
-        user='root',
-        password='123456',
-        charset='utf8mb4'
-    )
-    cursor = conn.cursor()
+# chunk_size 为 None 时逐个ID查询；否则去重后按 chunk_size 个一组用 IN (...) 批量查询
+# 传入 cache（FlagCache）时只查询缓存未命中或已过期的ID，并使用批量模式
+def check_names_in_db(ids, chunk_size=None, cache=None, known_size=KNOWN_IDS_SIZE):
+    if chunk_size or cache is not None:
+        return check_names_in_db_batched(ids, chunk_size or CHUNK_SIZE, cache, known_size)
+
+    # 数据库连接配置见 db_session 的 hangtian；同一条 SQL 反复执行，使用服务端预处理语句
+    conn = get_connection('hangtian')
+    cursor = conn.prepared_cursor()
 
     valid_records = []
 
@@ -48,14 +203,188 @@ def check_names_in_db(ids):
     return valid_records
 
 
+# 按 chunk_size 个一组查询去重后的ID，返回 {ID: flag_pos_3}，不存在的ID不在结果中
+def fetch_flags_batched(cursor, ids, chunk_size=CHUNK_SIZE):
+    unique_ids = list(dict.fromkeys(ids))
+    flags = {}
+    for start in range(0, len(unique_ids), chunk_size):
+        chunk = unique_ids[start:start + chunk_size]
+        placeholders = ', '.join(['%s'] * len(chunk))
+        sql = f"SELECT sale_order_sub_no, flag_pos_3 FROM xd4 WHERE sale_order_sub_no IN ({placeholders})"
+        cursor.execute(sql, chunk)
+        for sale_order_sub_no, flag in cursor.fetchall():
+            # 同一ID有多行时与逐个查询一样只取第一行
+            flags.setdefault(sale_order_sub_no, flag)
+    return flags
+
+
+# 批量模式：结果按输入顺序输出，有效 / 不存在 / NULL 的判断与逐个查询一致
+# ids 可以是列表，也可以是 iter_ids 产出的迭代器，每次只读入 chunk_size 个ID
+# 最近查询过的 known_size 个ID（包括不存在的）记在 known 中，在后面的组里重复出现时不再查询，但仍按出现次数输出；
+# 超出 known_size 时淘汰最久未出现的ID，之后再出现则重新从 cache 或数据库获取。
+# ID 已去重（--dedupe）时传 known_size=0，不再额外记录
+def check_names_in_db_batched(ids, chunk_size=CHUNK_SIZE, cache=None, known_size=KNOWN_IDS_SIZE):
+    conn = get_connection('hangtian')
+    # IN 列表长度不固定，使用普通游标
+    cursor = conn.cursor()
+
+    # ID -> flag_pos_3，不存在的ID记为 MISSING；按最近出现的顺序排列
+    known = OrderedDict()
+    valid_records = []
+    try:
+        for chunk in iter_chunks(ids, chunk_size):
+            chunk_flags = {}
+            new_ids = []
+            for id_val in dict.fromkeys(chunk):
+                if id_val in known:
+                    known.move_to_end(id_val)
+                    chunk_flags[id_val] = known[id_val]
+                else:
+                    new_ids.append(id_val)
+            if not new_ids:
+                fetched = {}
+            elif cache is None:
+                fetched = fetch_flags_batched(cursor, new_ids, chunk_size)
+            else:
+                fetched, to_fetch = cache.get_many(new_ids)
+                if to_fetch:
+                    from_db = fetch_flags_batched(cursor, to_fetch, chunk_size)
+                    cache.put_many(to_fetch, from_db)
+                    fetched.update(from_db)
+            for id_val in new_ids:
+                chunk_flags[id_val] = fetched.get(id_val, MISSING)
+                if known_size:
+                    known[id_val] = chunk_flags[id_val]
+                    if len(known) > known_size:
+                        known.popitem(last=False)
+
+            for id_val in chunk:
+                flag = chunk_flags[id_val]
+                if flag is MISSING:
+                    print(f"ID: {id_val} 不存在")
+                elif flag is not None:
+                    valid_records.append(id_val)
+                    print(f"ID: {id_val} | Name: {flag}")
+    finally:
+        cursor.close()
+        conn.close()
+
+    return valid_records
+
+
+# 异步查询：按 chunk_size 分组后最多 concurrency 组同时查询，每组完成即产出 (本组ID, {ID: flag_pos_3})
+# 需要安装 aiomysql，连接参数与 check_names_in_db 相同（db_session 的 hangtian）
+async def stream_flags_async(ids, chunk_size=CHUNK_SIZE, concurrency=4):
+    import aiomysql
+
+    config = load_db_config('hangtian')
+    unique_ids = list(dict.fromkeys(ids))
+    chunks = [unique_ids[start:start + chunk_size] for start in range(0, len(unique_ids), chunk_size)]
+    semaphore = asyncio.Semaphore(concurrency)
+
+    pool = await aiomysql.create_pool(
+        minsize=1,
+        maxsize=concurrency,
+        host=config['host'],
+        port=config['port'],
+        db=config['database'],
+        user=config['user'],
+        password=config['password'],
+        charset=config['charset'],
+        connect_timeout=config['connect_timeout'],
+    )
+
+    async def query_chunk(chunk):
+        placeholders = ', '.join(['%s'] * len(chunk))
+        sql = f"SELECT sale_order_sub_no, flag_pos_3 FROM xd4 WHERE sale_order_sub_no IN ({placeholders})"
+        async with semaphore:
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(sql, chunk)
+                    rows = await cursor.fetchall()
+        flags = {}
+        for sale_order_sub_no, flag in rows:
+            flags.setdefault(sale_order_sub_no, flag)
+        return chunk, flags
+
+    tasks = [asyncio.ensure_future(query_chunk(chunk)) for chunk in chunks]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        for task in tasks:
+            task.cancel()
+        pool.close()
+        await pool.wait_closed()
+
+
+# 异步版本的 check_names_in_db：每组完成时输出该组统计，最后按输入顺序返回有效ID
+async def check_names_in_db_async(ids, chunk_size=CHUNK_SIZE, concurrency=4, cache=None):
+    if cache is None:
+        flags, to_fetch = {}, list(dict.fromkeys(ids))
+    else:
+        flags, to_fetch = cache.get_many(ids)
+    done = 0
+    total = (len(to_fetch) + chunk_size - 1) // chunk_size
+    async for chunk, chunk_flags in stream_flags_async(to_fetch, chunk_size, concurrency):
+        done += 1
+        flags.update(chunk_flags)
+        if cache is not None:
+            cache.put_many(chunk, chunk_flags)
+        valid = sum(1 for flag in chunk_flags.values() if flag is not None)
+        print(f"已完成 {done}/{total} 组：有效 {valid}，NULL {len(chunk_flags) - valid}，"
+              f"不存在 {len(chunk) - len(chunk_flags)}")
+
+    return [id_val for id_val in ids if flags.get(id_val) is not None]
+
+
 # 主程序
 if __name__ == "__main__":
-    file_path = '航空航天.txt'
+    parser = argparse.ArgumentParser(description='检查订单文件中的XD编号在 xd4 表中的 flag_pos_3')
+    parser.add_argument('file_path', nargs='?', default='航空航天.txt')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='每条 IN (...) 查询的ID个数')
+    parser.add_argument('--async', dest='use_async', action='store_true', help='使用 aiomysql 并发查询')
+    parser.add_argument('--concurrency', type=int, default=4, help='--async 时同时进行的查询数')
+    parser.add_argument('--stream', action='store_true', help='分块读取文件，逐个把ID交给查询（适合大文件）')
+    parser.add_argument('--dedupe', action='store_true',
+                        help='同一ID只输出一次（不加时重复的ID也只查询一次，但按出现次数输出）')
+    # 缓存默认关闭：缓存期间数据库中的变化（ttl 内）不会被看到
+    parser.add_argument('--cache', nargs='?', default=None,
+                        const=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'id_cache.sqlite3'),
+                        help='使用本地ID缓存（默认不使用）；可指定缓存文件，不指定时为脚本目录下的 id_cache.sqlite3')
+    parser.add_argument('--no-cache', action='store_true', help='不使用本地ID缓存（覆盖 --cache）')
+    parser.add_argument('--refresh', action='store_true', help='配合 --cache：忽略已缓存的结果，全部重新查询并写回缓存')
+    parser.add_argument('--ttl', type=float, default=24, help='缓存有效期（小时）')
+    parser.add_argument('--cache-size', type=int, default=1000000, help='缓存最多保留的ID数')
+    args = parser.parse_args()
+
+    cache = None
+    if args.cache and not args.no_cache:
+        cache = FlagCache(args.cache, ttl=args.ttl * 3600, max_entries=args.cache_size, refresh=args.refresh)
 
     # 提取所有ID
-    ids = extract_ids(file_path)
-    print(f"共找到 {len(ids)} 个ID")
+    if args.stream:
+        ids = iter_ids(args.file_path, dedupe=args.dedupe)
+        if args.use_async:
+            # 异步模式需要先拿到全部ID才能分组并发
+            ids = list(ids)
+    else:
+        ids = extract_ids(args.file_path)
+        if args.dedupe:
+            ids = list(dict.fromkeys(ids))
+    if isinstance(ids, list):
+        print(f"共找到 {len(ids)} 个ID")
 
     # 查询数据库并过滤有效记录
-    valid_ids = check_names_in_db(ids)
-    print(f"共有 {len(valid_ids)} 个ID的name字段非空")
\ No newline at end of file
+    try:
+        if args.use_async:
+            valid_ids = asyncio.run(check_names_in_db_async(ids, args.chunk_size, args.concurrency, cache))
+        else:
+            # --dedupe 时每个ID只出现一次，不需要记录已查询的ID
+            valid_ids = check_names_in_db(ids, chunk_size=args.chunk_size, cache=cache,
+                                          known_size=0 if args.dedupe else KNOWN_IDS_SIZE)
+    finally:
+        if cache is not None:
+            print(cache.stats())
+            cache.close()
+    print(f"共有 {len(valid_ids)} 个ID的name字段非空")
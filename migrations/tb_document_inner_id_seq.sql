@@ -0,0 +1,11 @@
+-- doc_splite.py 并行导入使用的 inner_id 序列表
+-- 单行计数器：reserve_inner_id_range 用 UPDATE ... LAST_INSERT_ID(next_id + n) 为每个文档原子地预留一段 inner_id
+-- 首次部署时执行一次；next_id 从现有目录的最大 inner_id 开始
+
+CREATE TABLE IF NOT EXISTS tb_document_inner_id_seq (
+    id TINYINT PRIMARY KEY,
+    next_id BIGINT NOT NULL
+);
+
+INSERT IGNORE INTO tb_document_inner_id_seq (id, next_id)
+SELECT 1, COALESCE(MAX(inner_id*1), 0) FROM tb_document_catalog;
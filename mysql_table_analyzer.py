@@ -1,23 +1,33 @@
-import mysql.connector
 from mysql.connector import Error
 import pandas as pd
 import numpy as np
 import os
+import argparse
+import heapq
+import math
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
+from db_session import get_connection, load_db_config
+from table_sketches import MisraGries
 
-def analyze_mysql_table(host, user, password, database, table_name, port=3306, max_unique_values=20):
+
+def analyze_mysql_table(host, user, password, database, table_name, port=3306, max_unique_values=20,
+                        chunk_size=None, max_tracked_values=100000, pushdown=False, approx_distinct=False):
     """
     连接到MySQL数据库，分析指定表的结构和内容，返回结构化分析结果
+
+    chunk_size 不为 None 时使用流式模式：通过非缓冲游标每次读取 chunk_size 行并累加统计，
+    不把整张表读入DataFrame；每列最多精确记录 max_tracked_values 个不同值，超出后唯一值数量和频率为近似值
+
+    pushdown 为 True 时由数据库完成统计（适合 Doris 等MPP库）：一条聚合SQL计算各列的数量、最值和唯一值数量，
+    一条 UNION ALL 的分组SQL取各列频率最高的值，只有统计结果传回；
+    approx_distinct 为 True 时唯一值数量使用 APPROX_COUNT_DISTINCT（Doris 支持，MySQL 不支持）
     """
     try:
-        # 连接数据库
-        connection = mysql.connector.connect(
-            host=host,
-            user=user,
-            password=password,
-            database=database,
-            port=port
-        )
+        # 从共享连接池取出连接
+        connection = get_connection('dexp', host=host, user=user, password=password, database=database, port=port)
 
         if connection.is_connected():
             cursor = connection.cursor()
@@ -28,7 +38,13 @@ def analyze_mysql_table(host, user, password, database, table_name, port=3306, m
 
             # 获取表数据
             query = f"SELECT * FROM {table_name}"
-            df = pd.read_sql(query, connection)
+            if pushdown:
+                column_stats = pushdown_column_stats(connection, table_name, table_structure,
+                                                     max(max_unique_values, 10), approx_distinct)
+            elif chunk_size:
+                accumulators = stream_column_stats(connection, query, chunk_size, max_tracked_values)
+            else:
+                df = pd.read_sql(query, connection)
 
             # 存储分析结果的列表（每个元素是一行数据）
             analysis_results = []
@@ -49,7 +65,13 @@ def analyze_mysql_table(host, user, password, database, table_name, port=3306, m
                 friendly_type = convert_to_friendly_type(raw_type)
 
                 # 4. 说明（整合缺失值、唯一值分布等信息）
-                field_note = generate_field_note(df, column_name, max_unique_values)
+                if pushdown:
+                    field_note = generate_field_note(None, column_name, max_unique_values,
+                                                     pushdown_stats=column_stats[column_name])
+                elif chunk_size:
+                    field_note = accumulators[column_name].field_note(max_unique_values)
+                else:
+                    field_note = generate_field_note(df, column_name, max_unique_values)
 
                 # 添加到结果列表
                 analysis_results.append({
@@ -100,11 +122,35 @@ def convert_to_friendly_type(db_type):
         return db_type
 
 
-def generate_field_note(df, column_name, max_unique_values):
-    """生成字段说明（包含缺失值、唯一值分布等）"""
+def generate_field_note(df, column_name, max_unique_values, pushdown_stats=None):
+    """生成字段说明（包含缺失值、唯一值分布等）；传入 pushdown_stats（pushdown_column_stats 的结果）时不使用 df"""
+    if pushdown_stats is not None:
+        return format_field_note(**pushdown_stats, max_unique_values=max_unique_values)
+
     series = df[column_name]
-    total = len(series)
-    missing = series.isna().sum()
+    is_numeric = pd.api.types.is_numeric_dtype(series)
+    min_val = max_val = None
+    if is_numeric:
+        try:
+            min_val = series.min()
+            max_val = series.max()
+        except:
+            pass
+    return format_field_note(len(series), series.isna().sum(), series.nunique(), is_numeric,
+                             min_val, max_val, series.value_counts().sort_values(ascending=False), max_unique_values)
+
+
+def format_field_note(total, missing, unique_count, is_numeric, min_val, max_val, value_counts, max_unique_values,
+                      approximate=False, count_error=0):
+    """
+    根据列统计结果生成字段说明文本
+
+    value_counts 为按频率降序排列的 (值, 次数)（Series 或 dict），至少包含前 max_unique_values 个值；
+    min_val 为 None 时不输出数值范围；approximate 为 True 时唯一值数量和频率为近似值，
+    此时各值的出现次数为下界，真实次数最多再多 count_error 次
+    """
+    if hasattr(value_counts, 'items'):
+        value_counts = list(value_counts.items())
     note_parts = []
 
     # 缺失值信息
@@ -115,30 +161,25 @@ def generate_field_note(df, column_name, max_unique_values):
         note_parts.append(f"缺失值数量: 0（0.00%）")
 
     # 唯一值分布信息
-    unique_count = series.nunique()
-    note_parts.append(f"唯一值数量: {unique_count}")
+    note_parts.append(f"唯一值数量: {unique_count}" + ("（近似值）" if approximate else ""))
+    if approximate:
+        note_parts.append(f"注意: 以下出现次数为下界估计，每个值的真实次数最多再多 {count_error} 次")
 
     # 根据数据类型处理分布详情
-    if pd.api.types.is_numeric_dtype(series):
+    if is_numeric:
         # 数值类型：补充范围
-        try:
-            min_val = series.min()
-            max_val = series.max()
+        if min_val is not None:
             note_parts.append(f"数值范围: {min_val} ~ {max_val}")
-        except:
-            pass
 
         # 唯一值分布
         if unique_count <= 10:
-            value_counts = series.value_counts().sort_values(ascending=False)
             dist_str = "唯一值分布 (按频率降序):\n" + "\n".join(
-                [f"  值 {v}: 出现 {c} 次" for v, c in value_counts.items()])
+                [f"  值 {v}: 出现 {c} 次" for v, c in value_counts])
             note_parts.append(dist_str)
         else:
             top_n = min(max_unique_values, unique_count)
-            value_counts = series.value_counts().sort_values(ascending=False).head(top_n)
             dist_str = f"注意: 唯一值较多，仅显示前{top_n}个 (按频率降序):\n" + "\n".join(
-                [f"  值 {v}: 出现 {c} 次" for v, c in value_counts.items()])
+                [f"  值 {v}: 出现 {c} 次" for v, c in value_counts[:top_n]])
             note_parts.append(dist_str)
 
     else:
@@ -148,34 +189,268 @@ def generate_field_note(df, column_name, max_unique_values):
         else:
             # 唯一值分布
             if unique_count <= max_unique_values:
-                value_counts = series.value_counts().sort_values(ascending=False)
                 dist_str = "唯一值分布 (按频率降序):\n" + "\n".join(
-                    [f"  '{v}': 出现 {c} 次（占比 {c / total * 100:.2f}%）" for v, c in value_counts.items()])
+                    [f"  '{v}': 出现 {c} 次（占比 {c / total * 100:.2f}%）" for v, c in value_counts])
                 note_parts.append(dist_str)
             else:
                 top_n = min(max_unique_values, unique_count)
-                value_counts = series.value_counts().sort_values(ascending=False).head(top_n)
                 dist_str = f"注意: 唯一值较多，仅显示前{top_n}个 (按频率降序):\n" + "\n".join(
-                    [f"  '{v}': 出现 {c} 次（占比 {c / total * 100:.2f}%）" for v, c in value_counts.items()])
+                    [f"  '{v}': 出现 {c} 次（占比 {c / total * 100:.2f}%）" for v, c in value_counts[:top_n]])
                 note_parts.append(dist_str)
 
     # 合并所有说明，用换行分隔
     return "\n".join(note_parts)
 
 
+def mix64(value):
+    """把 hash(value) 打散为均匀分布的64位整数（splitmix64），小整数的 hash 就是其本身，不能直接用于估计"""
+    z = (hash(value) + 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return z ^ (z >> 31)
+
+
+# pandas 读取后为数值列的数据库类型（DECIMAL 读取为 Decimal，在DataFrame中是 object 列）
+INTEGER_SQL_TYPES = {'tinyint', 'smallint', 'mediumint', 'int', 'integer', 'bigint'}
+FLOAT_SQL_TYPES = {'float', 'double', 'real'}
+
+
+def base_sql_type(raw_type):
+    """'bigint(20) unsigned' -> 'bigint'；部分驱动的 DESCRIBE 返回 bytes"""
+    if isinstance(raw_type, bytes):
+        raw_type = raw_type.decode()
+    return raw_type.lower().split('(')[0].split()[0]
+
+
+def pushdown_column_stats(connection, table_name, table_structure, top_n, approx_distinct=False):
+    """
+    在数据库端计算各列统计，返回 {列名: format_field_note 的参数}，与读入DataFrame后的统计结果一致
+
+    top_n 为每列取回的最高频值个数，应不小于 max(max_unique_values, 10)
+    """
+    columns = [column_info[0] for column_info in table_structure]
+    raw_types = {column_info[0]: column_info[1] for column_info in table_structure}
+    distinct_func = "APPROX_COUNT_DISTINCT({})" if approx_distinct else "COUNT(DISTINCT {})"
+
+    # 一条聚合SQL：总行数 + 每列 COUNT / MIN / MAX / 唯一值数量
+    select_items = ["COUNT(*)"]
+    for column in columns:
+        quoted = f"`{column}`"
+        select_items += [f"COUNT({quoted})", f"MIN({quoted})", f"MAX({quoted})", distinct_func.format(quoted)]
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"SELECT {', '.join(select_items)} FROM {table_name}")
+        row = cursor.fetchone()
+        total = row[0]
+        aggregates = {}
+        for index, column in enumerate(columns):
+            non_null, min_val, max_val, unique_count = row[1 + index * 4: 5 + index * 4]
+            aggregates[column] = (non_null, min_val, max_val, unique_count)
+
+        # 一条 UNION ALL SQL：每列按值分组取出现次数最多的 top_n 个值
+        top_values = {column: [] for column in columns}
+        subqueries = [
+            f"(SELECT {index} AS column_index, CAST(`{column}` AS CHAR) AS value, COUNT(*) AS cnt "
+            f"FROM {table_name} WHERE `{column}` IS NOT NULL GROUP BY `{column}` ORDER BY cnt DESC LIMIT {top_n})"
+            for index, column in enumerate(columns) if aggregates[column][3]
+        ]
+        if subqueries:
+            cursor.execute(" UNION ALL ".join(subqueries))
+            for column_index, value, count in cursor.fetchall():
+                top_values[columns[column_index]].append((value, count))
+    finally:
+        cursor.close()
+
+    column_stats = {}
+    for column in columns:
+        non_null, min_val, max_val, unique_count = aggregates[column]
+        missing = total - non_null
+        base_type = base_sql_type(raw_types[column])
+        # 整列为空时 pandas 得到 object 列
+        is_numeric = non_null > 0 and (base_type in INTEGER_SQL_TYPES or base_type in FLOAT_SQL_TYPES)
+        # 与 pandas 一致：含缺失值的整数列为 float64
+        as_float = base_type in FLOAT_SQL_TYPES or missing > 0
+        convert = (float if as_float else int) if is_numeric else (lambda v: v)
+        value_counts = sorted(((convert(value), count) for value, count in top_values[column]),
+                              key=lambda item: item[1], reverse=True)
+        column_stats[column] = {
+            'total': total,
+            'missing': missing,
+            'unique_count': unique_count,
+            'is_numeric': is_numeric,
+            'min_val': convert(min_val) if is_numeric else None,
+            'max_val': convert(max_val) if is_numeric else None,
+            'value_counts': value_counts,
+        }
+    return column_stats
+
+
+class ColumnAccumulator:
+    """
+    流式累加单列统计：总数、缺失值、最值、唯一值数量和各值出现次数
+
+    各值的出现次数记在 MisraGries 摘要中：不同值不超过 max_tracked_values 个时为精确值，
+    超过后各计数扣减第 max_tracked_values + 1 大的次数（结果变为下界，误差记在 frequent.error 中），
+    此时唯一值数量改用 KMV（最小 k 个哈希值）估计，内存与 max_tracked_values 成正比
+    """
+
+    KMV_SIZE = 1024
+
+    def __init__(self, max_tracked_values=100000):
+        self.max_tracked_values = max_tracked_values
+        self.total = 0
+        self.missing = 0
+        self.min_val = None
+        self.max_val = None
+        # 与 pandas 一致：所有非空值都是 int/float 时按数值列处理（Decimal 等在 DataFrame 中是 object 列）
+        self.is_numeric = True
+        self.has_float = False
+        self.frequent = MisraGries(max_tracked_values)
+        self._kmv = []  # 取负值的最大堆，保存最小的 KMV_SIZE 个哈希值
+        self._kmv_set = set()
+
+    @property
+    def approximate(self):
+        return self.frequent.approximate
+
+    def update(self, values):
+        counts = Counter()
+        for value in values:
+            self.total += 1
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                self.missing += 1
+                continue
+            if self.is_numeric:
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    self.is_numeric = False
+                elif isinstance(value, float):
+                    self.has_float = True
+            try:
+                if self.min_val is None or value < self.min_val:
+                    self.min_val = value
+                if self.max_val is None or value > self.max_val:
+                    self.max_val = value
+            except TypeError:
+                pass
+            counts[value] += 1
+            self._add_hash(value)
+        self.frequent.update(counts)
+
+    def _add_hash(self, value):
+        h = mix64(value)
+        if h in self._kmv_set:
+            return
+        if len(self._kmv) < self.KMV_SIZE:
+            heapq.heappush(self._kmv, -h)
+            self._kmv_set.add(h)
+        elif h < -self._kmv[0]:
+            removed = -heapq.heappushpop(self._kmv, -h)
+            self._kmv_set.discard(removed)
+            self._kmv_set.add(h)
+
+    def distinct_count(self):
+        if not self.approximate or len(self._kmv) < self.KMV_SIZE:
+            return len(self.frequent.counts) if not self.approximate else len(self._kmv)
+        kth_smallest = -self._kmv[0] / 2 ** 64
+        return int((self.KMV_SIZE - 1) / kth_smallest)
+
+    def field_note(self, max_unique_values):
+        is_numeric = self.is_numeric and self.missing < self.total
+        # pandas 中含缺失值的整数列会转成 float64，输出格式保持一致
+        as_float = is_numeric and (self.has_float or self.missing > 0)
+        convert = float if as_float else (lambda v: v)
+        value_counts = [(convert(v), c) for v, c in self.frequent.top(len(self.frequent.counts))]
+        min_val = convert(self.min_val) if is_numeric and self.min_val is not None else None
+        max_val = convert(self.max_val) if is_numeric and self.max_val is not None else None
+        return format_field_note(self.total, self.missing, self.distinct_count(), is_numeric, min_val, max_val,
+                                 value_counts, max_unique_values, self.approximate, self.frequent.error)
+
+
+def stream_column_stats(connection, query, chunk_size, max_tracked_values=100000):
+    """通过非缓冲游标分块读取查询结果，返回 {列名: ColumnAccumulator}"""
+    cursor = connection.cursor(buffered=False)
+    try:
+        cursor.execute(query)
+        column_names = [desc[0] for desc in cursor.description]
+        accumulators = {name: ColumnAccumulator(max_tracked_values) for name in column_names}
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            for name, values in zip(column_names, zip(*rows)):
+                accumulators[name].update(values)
+        return accumulators
+    finally:
+        cursor.close()
+
+
+def analyze_tables(tables, host, user, password, database, port=3306, workers=4, output_file=None, **analyze_kwargs):
+    """
+    并发分析多张表，返回 (汇总DataFrame, {表名: 分析结果DataFrame})
+
+    最多 workers 张表同时分析，连接来自 db_session 的共享连接池（workers 不应超过池大小 pool_size）；
+    analyze_kwargs 透传给 analyze_mysql_table（如 max_unique_values、chunk_size、pushdown）；
+    output_file 不为 None 时写入一个Excel文件：每张表一个工作表，另有“汇总”工作表
+    """
+    def analyze_one(table_name):
+        start = time.perf_counter()
+        result = analyze_mysql_table(host, user, password, database, table_name, port, **analyze_kwargs)
+        return result, time.perf_counter() - start
+
+    results = {}
+    summary_rows = []
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(analyze_one, table_name): table_name for table_name in tables}
+        for future in as_completed(futures):
+            table_name = futures[future]
+            try:
+                result, elapsed = future.result()
+            except Exception as e:
+                result, elapsed = None, None
+                print(f"表 {table_name} 分析失败: {e}")
+            if result is not None:
+                results[table_name] = result
+                print(f"表 {table_name} 分析完成，耗时 {elapsed:.2f} 秒")
+            summary_rows.append({
+                "表名": table_name,
+                "字段数": len(result) if result is not None else 0,
+                "耗时(秒)": round(elapsed, 2) if elapsed is not None else None,
+                "状态": "成功" if result is not None else "失败",
+            })
+
+    # 汇总按输入顺序排列
+    order = {table_name: index for index, table_name in enumerate(tables)}
+    summary_rows.sort(key=lambda row: order[row["表名"]])
+    summary = pd.DataFrame(summary_rows, columns=["表名", "字段数", "耗时(秒)", "状态"])
+
+    if output_file:
+        write_combined_workbook(output_file, summary, results, tables)
+        print(f"分析报告已保存为: {os.path.abspath(output_file)}")
+    return summary, results
+
+
+def write_combined_workbook(output_file, summary, results, tables):
+    """写入汇总工作表和每张表的工作表；Excel 工作表名最长31个字符，重名时加序号"""
+    used_names = {"汇总"}
+    with pd.ExcelWriter(output_file) as writer:
+        summary.to_excel(writer, sheet_name="汇总", index=False)
+        for table_name in tables:
+            if table_name not in results:
+                continue
+            sheet_name = table_name[:31]
+            suffix = 1
+            while sheet_name in used_names:
+                suffix += 1
+                sheet_name = f"{table_name[:31 - len(str(suffix)) - 1]}~{suffix}"
+            used_names.add(sheet_name)
+            results[table_name].to_excel(writer, sheet_name=sheet_name, index=False)
+
+
 if __name__ == "__main__":
-    # 配置数据库连接参数
-    config = {
-        'host': '10.60.2.187',
-        'user': 'dexp',
-        'password': 'lopkaTBdq62Z',
-        'database': 'dexpdb',
-        'table_name': 'dwd_htcl_process_round_bar_turn',
-        'port': 9030,
-        'max_unique_values': 20  # 最多显示的唯一值数量
-    }
-
-    tables = {
+    # 配置数据库连接参数（见 db_session 的 dexp，可用配置文件或环境变量覆盖）
+    db_config = load_db_config('dexp')
+
+    default_tables = [
         # 'dwd_htcl_process_extrusion_line_1'
         # 'dwd_htcl_process_extrusion_line_2',
         # 'dwd_htcl_process_extrusion_line_3',
@@ -192,22 +467,30 @@ if __name__ == "__main__":
         #热轧的
         # 'dwd_htcl_process_plate_saw',
         'dwd_htcl_process_plate_brush'
-
-
-    }
-    for table in tables:
-        config['table_name'] = table
-        # 执行分析，获取表格
-        result_table = analyze_mysql_table(**config)
-
-        if result_table is not None:
-            # 自定义输出文件名（包含表名）
-            output_filename = f"{config['table_name']}_字段分析报告.csv"
-
-            # 保存为CSV（支持Excel打开，中文无乱码）
-            # result_table.to_csv(output_filename, index=False, encoding='utf-8-sig')
-            print(f"分析报告已保存为: {os.path.abspath(output_filename)}")
-
-            # 可选：也支持保存为Excel
-            result_table.to_excel(f"{config['table_name']}_字段分析报告.xlsx", index=False)
-
+    ]
+
+    parser = argparse.ArgumentParser(description='并发分析多张表的字段，输出一个汇总Excel')
+    parser.add_argument('tables', nargs='*', default=default_tables)
+    parser.add_argument('--workers', type=int, default=4, help='同时分析的表数（不超过连接池大小）')
+    parser.add_argument('--output', default='字段分析报告.xlsx')
+    parser.add_argument('--max-unique-values', type=int, default=20, help='最多显示的唯一值数量')
+    parser.add_argument('--chunk-size', type=int, default=None, help='流式读取时每次读取的行数')
+    parser.add_argument('--pushdown', action='store_true', help='由数据库端计算统计')
+    parser.add_argument('--approx-distinct', action='store_true', help='唯一值数量使用 APPROX_COUNT_DISTINCT')
+    args = parser.parse_args()
+
+    summary, _ = analyze_tables(
+        args.tables,
+        host=db_config['host'],
+        user=db_config['user'],
+        password=db_config['password'],
+        database=db_config['database'],
+        port=db_config['port'],
+        workers=args.workers,
+        output_file=args.output,
+        max_unique_values=args.max_unique_values,
+        chunk_size=args.chunk_size,
+        pushdown=args.pushdown,
+        approx_distinct=args.approx_distinct,
+    )
+    print(summary.to_string(index=False))
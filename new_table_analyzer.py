@@ -1,13 +1,21 @@
-import mysql.connector
 from mysql.connector import Error
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 from collections import Counter
 import re
+import json
+import math
+import os
+import random
 from scipy import stats
 import seaborn as sns
 from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from db_session import get_connection, load_db_config
+from mysql_table_analyzer import FLOAT_SQL_TYPES, INTEGER_SQL_TYPES, base_sql_type
+from table_sketches import CorrelationAccumulator, TableSketch, decode_value, encode_value
 
 
 class MySQLTableAnalyzer:
@@ -25,17 +33,22 @@ class MySQLTableAnalyzer:
         self.data = None
         self.structure = None
         self.report = []
+        # 抽样信息（方式、请求数量），写入报告头部
+        self.sample_info = None
+        # 列统计缓存：{列名: _compute_column_stats 的结果}，self.data 变化后自动失效
+        self._column_stats = {}
+        self._column_stats_data = None
+        # 流式草图统计结果（TableSketch），不需要把整表读入 self.data
+        self.sketch = None
+        # 增量统计：上次运行保存的统计快照（用于漂移比较）和本次的水位信息
+        self.baseline_summary = None
+        self.incremental_info = None
 
     def connect(self):
-        """连接到MySQL数据库"""
+        """从共享连接池取出数据库连接"""
         try:
-            self.connection = mysql.connector.connect(
-                host=self.host,
-                user=self.user,
-                password=self.password,
-                database=self.database,
-                port=self.port
-            )
+            self.connection = get_connection('dexp', host=self.host, user=self.user, password=self.password,
+                                             database=self.database, port=self.port)
             if self.connection.is_connected():
                 print(f"成功连接到数据库: {self.database}")
                 return True
@@ -46,8 +59,10 @@ class MySQLTableAnalyzer:
     def disconnect(self):
         """断开数据库连接"""
         if self.connection and self.connection.is_connected():
+            # 归还到连接池
             self.connection.close()
             print("数据库连接已关闭")
+        self.connection = None
 
     def fetch_table_structure(self):
         """获取表结构信息"""
@@ -63,30 +78,468 @@ class MySQLTableAnalyzer:
         print(f"已获取表 '{self.table_name}' 的结构信息")
         return True
 
-    def fetch_table_data(self, sample_size=None):
+    # fetch_table_data 支持的抽样方式
+    SAMPLE_METHODS = ('limit', 'tablesample', 'random', 'hash', 'reservoir', 'stratified')
+
+    def fetch_table_data(self, sample_size=None, sample_method='limit', sample_key=None, strata_column=None,
+                         seed=None):
         """
         获取表数据，可以选择获取全量数据或抽样数据
 
         参数:
         sample_size (int): 抽样大小，如果为None则获取全量数据
+        sample_method (str): 抽样方式
+            limit       - LIMIT n，最快，但取到的是存储顺序的前n行，统计有偏
+            tablesample - 服务端随机抽样 TABLESAMPLE(n ROWS)（Doris 支持），不支持时退回 random
+            random      - 服务端按 RAND() 过滤全表（略多取），再在客户端均匀抽取 n 行
+            hash        - 按 CRC32(sample_key) 取模过滤，结果可重复
+            reservoir   - 非缓冲游标流式读取全表，在客户端做蓄水池抽样（结果精确为n行）
+            stratified  - 按 strata_column（如分区/日期列）分层，各层按行数比例抽样（一次查询，总数不超过 n）
+        sample_key (str): hash 抽样使用的列（一般为主键）
+        strata_column (str): stratified 抽样的分层列
+        seed (int): reservoir 抽样以及 random/stratified 客户端截取的随机种子
         """
         if not self.connection or not self.connection.is_connected():
             if not self.connect():
                 return False
 
-        if sample_size:
-            # 使用SQL LIMIT进行抽样
-            query = f"SELECT * FROM {self.table_name} LIMIT {sample_size}"
-            print(f"正在从表 '{self.table_name}' 中抽样 {sample_size} 条记录...")
-        else:
+        if not sample_size:
             # 获取全量数据
             query = f"SELECT * FROM {self.table_name}"
             print(f"正在从表 '{self.table_name}' 中获取全量数据...")
+            self.data = pd.read_sql(query, self.connection)
+            self.sample_info = None
+            print(f"数据获取完成，共 {len(self.data)} 条记录")
+            return True
 
-        self.data = pd.read_sql(query, self.connection)
+        if sample_method not in self.SAMPLE_METHODS:
+            raise ValueError(f"不支持的抽样方式: {sample_method}，可选: {', '.join(self.SAMPLE_METHODS)}")
+        print(f"正在从表 '{self.table_name}' 中抽样 {sample_size} 条记录（{sample_method}）...")
+
+        if sample_method == 'limit':
+            # 使用SQL LIMIT进行抽样
+            self.data = pd.read_sql(f"SELECT * FROM {self.table_name} LIMIT {sample_size}", self.connection)
+        elif sample_method == 'tablesample':
+            try:
+                self.data = pd.read_sql(
+                    f"SELECT * FROM {self.table_name} TABLESAMPLE({sample_size} ROWS) LIMIT {sample_size}",
+                    self.connection)
+            except Exception as e:
+                print(f"数据库不支持 TABLESAMPLE（{e}），改用 random 抽样")
+                sample_method = 'random'
+                self.data = self._sample_random(sample_size, seed)
+        elif sample_method == 'random':
+            self.data = self._sample_random(sample_size, seed)
+        elif sample_method == 'hash':
+            if not sample_key:
+                raise ValueError("hash 抽样需要指定 sample_key")
+            self.data = self._sample_hash(sample_size, sample_key)
+        elif sample_method == 'reservoir':
+            self.data = self._sample_reservoir(sample_size, seed)
+        else:
+            if not strata_column:
+                raise ValueError("stratified 抽样需要指定 strata_column")
+            self.data = self._sample_stratified(sample_size, strata_column, seed)
+
+        self.sample_info = {'method': sample_method, 'requested': sample_size, 'size': len(self.data)}
+        if strata_column and sample_method == 'stratified':
+            self.sample_info['strata_column'] = strata_column
+        if sample_key and sample_method == 'hash':
+            self.sample_info['sample_key'] = sample_key
         print(f"数据获取完成，共 {len(self.data)} 条记录")
         return True
 
+    def _count_rows(self):
+        cursor = self.connection.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM {self.table_name}")
+        total = cursor.fetchone()[0]
+        cursor.close()
+        return total
+
+    def _sample_random(self, sample_size, seed=None):
+        """
+        服务端随机过滤：按 1.2 倍比例过滤全表，再在客户端均匀抽取 sample_size 行
+
+        不能在 SQL 中 LIMIT：取满 n 行就停止扫描，存储顺序靠后的行永远抽不到
+        """
+        total = self._count_rows()
+        fraction = min(1.0, sample_size * 1.2 / total) if total else 1.0
+        data = pd.read_sql(f"SELECT * FROM {self.table_name} WHERE RAND() < {fraction}", self.connection)
+        if len(data) > sample_size:
+            data = data.sample(n=sample_size, random_state=seed).sort_index().reset_index(drop=True)
+        return data
+
+    def _sample_hash(self, sample_size, sample_key):
+        """
+        按键的 CRC32 取模抽样，同一张表每次抽到的行相同
+
+        服务端按 1.2 倍比例过滤（不 LIMIT，理由同 _sample_random），
+        客户端再保留 CRC32 值最小的 sample_size 行，结果与存储顺序无关
+        """
+        total = self._count_rows()
+        buckets = max(1, math.floor(total / (sample_size * 1.2)))
+        crc = f"CRC32(CAST(`{sample_key}` AS CHAR))"
+        query = f"SELECT t.*, {crc} AS _sample_crc FROM {self.table_name} t WHERE MOD({crc}, {buckets}) = 0"
+        data = pd.read_sql(query, self.connection)
+        if len(data) > sample_size:
+            data = data.sort_values(['_sample_crc', sample_key], kind='mergesort').head(sample_size).sort_index()
+        return data.drop(columns='_sample_crc').reset_index(drop=True)
+
+    def _sample_reservoir(self, sample_size, seed=None, chunk_size=10000):
+        """蓄水池抽样（Algorithm R）：流式读取全表，内存只保留 sample_size 行"""
+        rng = random.Random(seed)
+        reservoir = []
+        seen = 0
+        cursor = self.connection.cursor(buffered=False)
+        try:
+            cursor.execute(f"SELECT * FROM {self.table_name}")
+            columns = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                for row in rows:
+                    seen += 1
+                    if len(reservoir) < sample_size:
+                        reservoir.append(row)
+                    else:
+                        index = rng.randrange(seen)
+                        if index < sample_size:
+                            reservoir[index] = row
+        finally:
+            cursor.close()
+        return pd.DataFrame.from_records(reservoir, columns=columns)
+
+    def _sample_stratified(self, sample_size, strata_column, seed=None):
+        """
+        按分层列各取值的行数比例分配名额，层内随机抽取；一次窗口函数查询完成，总数不超过 sample_size
+
+        服务端按层内随机顺序编号，每层取前 ceil(层行数 * n / 总行数) 行（不少于 1 行），
+        客户端再按层内序号与比例名额之比裁掉多余的行（各层按比例缩减）；层数不超过 sample_size 时每层至少保留 1 行
+        """
+        query = f"""
+            SELECT * FROM (
+                SELECT t.*,
+                       ROW_NUMBER() OVER (PARTITION BY `{strata_column}` ORDER BY RAND()) AS _sample_rn,
+                       COUNT(*) OVER (PARTITION BY `{strata_column}`) AS _sample_cnt,
+                       COUNT(*) OVER () AS _sample_total
+                FROM {self.table_name} t
+            ) s
+            WHERE _sample_rn <= CEIL(_sample_cnt * {sample_size} / _sample_total)
+        """
+        try:
+            data = pd.read_sql(query, self.connection)
+        except Exception as e:
+            print(f"数据库不支持窗口函数（{e}），改用 random 抽样")
+            return self._sample_random(sample_size, seed)
+
+        helper_columns = ['_sample_rn', '_sample_cnt', '_sample_total']
+        if len(data) > sample_size:
+            ideal = data['_sample_cnt'] * sample_size / data['_sample_total']
+            # 按层内序号占比例名额的比值裁剪，各层按比例缩减；每层第 1 行最优先保留
+            excess = data['_sample_rn'] / ideal
+            if data[strata_column].nunique(dropna=False) <= sample_size:
+                excess = excess.where(data['_sample_rn'] != 1, -1.0)
+            rng = np.random.default_rng(seed)
+            order = np.lexsort((rng.random(len(data)), excess.to_numpy()))
+            data = data.iloc[np.sort(order[:sample_size])]
+        return data.drop(columns=helper_columns).reset_index(drop=True)
+
+    def fetch_table_sketch(self, chunk_size=100000, where=None, connection=None, params=None, **sketch_options):
+        """
+        用非缓冲游标分块读取表（where 不为 None 时只读取该条件的分区），逐块更新草图，返回 TableSketch
+
+        内存只与 chunk_size 和草图大小有关，与表的行数无关；sketch_options 透传给 ColumnSketch（hll_p、kll_k、top_k）
+        """
+        if connection is None:
+            if not self.connection or not self.connection.is_connected():
+                if not self.connect():
+                    return None
+            connection = self.connection
+
+        query = f"SELECT * FROM {self.table_name}"
+        if where:
+            query += f" WHERE {where}"
+        sketch = TableSketch(**sketch_options)
+        cursor = connection.cursor(buffered=False)
+        try:
+            cursor.execute(query, params)
+            columns = [desc[0] for desc in cursor.description]
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                sketch.update(pd.DataFrame.from_records(rows, columns=columns))
+        finally:
+            cursor.close()
+        return sketch
+
+    def build_sketch(self, chunk_size=100000, partitions=None, workers=4, **sketch_options):
+        """
+        流式统计整表，结果保存在 self.sketch
+
+        partitions 为 WHERE 条件列表（如按日期分区）时并行读取各分区，
+        每个任务从共享连接池取一个连接，各自的草图最后合并
+        """
+        if not partitions:
+            print(f"正在流式统计表 '{self.table_name}'（每块 {chunk_size} 行）...")
+            self.sketch = self.fetch_table_sketch(chunk_size, **sketch_options)
+        else:
+            print(f"正在并行流式统计表 '{self.table_name}' 的 {len(partitions)} 个分区...")
+
+            def sketch_partition(where):
+                connection = get_connection('dexp', host=self.host, user=self.user, password=self.password,
+                                            database=self.database, port=self.port)
+                try:
+                    return self.fetch_table_sketch(chunk_size, where, connection, **sketch_options)
+                finally:
+                    connection.close()
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                sketches = list(executor.map(sketch_partition, partitions))
+            self.sketch = sketches[0]
+            for sketch in sketches[1:]:
+                self.sketch.merge(sketch)
+
+        if self.sketch is not None:
+            print(f"流式统计完成，共 {self.sketch.row_count} 条记录")
+        return self.sketch is not None
+
+    # 状态文件格式版本，格式不兼容时递增
+    SKETCH_STATE_VERSION = 1
+
+    def save_sketch_state(self, state_file, watermark_column=None, watermark=None, top_n=10, null_watermark_rows=0):
+        """
+        把 self.sketch 连同水位保存到 state_file（JSON，先写临时文件再替换，中途失败不会损坏旧状态）
+
+        null_watermark_rows 为已计入草图的水位列为 NULL 的行数
+        """
+        state = {
+            'version': self.SKETCH_STATE_VERSION,
+            'table_name': self.table_name,
+            'watermark_column': watermark_column,
+            'watermark': encode_value(watermark),
+            'null_watermark_rows': null_watermark_rows,
+            'saved_at': encode_value(datetime.now()),
+            'top_n': top_n,
+            'sketch': self.sketch.to_state(),
+        }
+        tmp_file = f"{state_file}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, ensure_ascii=False)
+        os.replace(tmp_file, state_file)
+        print(f"统计状态已保存到: {state_file}")
+
+    def load_sketch_state(self, state_file):
+        """读取 save_sketch_state 保存的状态，文件不存在时返回 None；统计快照 summary 由恢复的草图重新计算"""
+        if not os.path.exists(state_file):
+            return None
+        try:
+            with open(state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (UnicodeDecodeError, json.JSONDecodeError) as e:
+            raise ValueError(f"状态文件 {state_file} 不是 JSON 格式（旧版本保存的 pickle 状态不再读取），"
+                             f"请删除后重新全量统计") from e
+        if state.get('version') != self.SKETCH_STATE_VERSION:
+            raise ValueError(f"状态文件 {state_file} 的版本 {state.get('version')} 不受支持，请删除后重新全量统计")
+        if state['table_name'] != self.table_name:
+            raise ValueError(f"状态文件 {state_file} 属于表 '{state['table_name']}'，不是 '{self.table_name}'")
+        state['watermark'] = decode_value(state['watermark'])
+        state['saved_at'] = decode_value(state['saved_at'])
+        state['sketch'] = TableSketch.from_state(state['sketch'])
+        state['summary'] = state['sketch'].summary(state['top_n'])
+        return state
+
+    def build_sketch_incremental(self, state_file, watermark_column, chunk_size=100000, top_n=10,
+                                 **sketch_options):
+        """
+        增量流式统计：只读取水位列大于上次保存值的行，合并进上次的草图后再保存
+
+        watermark_column 应是只增不减的列（自增 id、写入时间等）；
+        已统计过的行被更新时不会从旧状态中扣除，需要定期删除状态文件做一次全量统计。
+        状态文件不存在（首次运行）或水位列改变时做全量统计。
+        水位列为 NULL 的行只在全量统计时计入；之后这类行数发生变化时给出警告（变化的部分不计入，需要重新全量统计）。
+        """
+        if not self.connection or not self.connection.is_connected():
+            if not self.connect():
+                return False
+
+        state = self.load_sketch_state(state_file)
+        if state is not None and state['watermark_column'] != watermark_column:
+            print(f"水位列由 '{state['watermark_column']}' 改为 '{watermark_column}'，重新全量统计")
+            state = None
+
+        # 先确定本次的上界，统计期间新写入的行留给下一次
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute(f"SELECT MAX(`{watermark_column}`), COUNT(*) - COUNT(`{watermark_column}`) "
+                           f"FROM {self.table_name}")
+            new_watermark, null_rows = cursor.fetchone()
+        finally:
+            cursor.close()
+        null_rows = int(null_rows or 0)
+
+        if state is None:
+            print(f"正在全量流式统计表 '{self.table_name}'（水位列 {watermark_column}）...")
+            if null_rows:
+                print(f"警告: 有 {null_rows} 行的水位列 {watermark_column} 为 NULL，已计入本次全量统计，"
+                      f"但之后无法按水位识别这些行的变化")
+            if new_watermark is None:
+                if null_rows:
+                    print(f"警告: 水位列 {watermark_column} 全部为 NULL，无法增量统计")
+                where, params = f"`{watermark_column}` IS NULL", None
+            else:
+                where, params = f"`{watermark_column}` <= %s OR `{watermark_column}` IS NULL", (new_watermark,)
+            self.baseline_summary = None
+            self.sketch = self.fetch_table_sketch(chunk_size, where, params=params, **sketch_options)
+            old_watermark = None
+            counted_null_rows = null_rows
+        else:
+            old_watermark = state['watermark']
+            counted_null_rows = state['null_watermark_rows']
+            self.baseline_summary = state['summary']
+            self.sketch = state['sketch']
+            if new_watermark is not None and (old_watermark is None or new_watermark > old_watermark):
+                print(f"正在增量统计表 '{self.table_name}'：{watermark_column} 在 ({old_watermark}, {new_watermark}] 之间的行...")
+                if old_watermark is None:
+                    where, params = f"`{watermark_column}` <= %s", (new_watermark,)
+                else:
+                    where, params = f"`{watermark_column}` > %s AND `{watermark_column}` <= %s", \
+                                    (old_watermark, new_watermark)
+                # 必须与已保存的草图参数一致才能合并
+                self.sketch.merge(self.fetch_table_sketch(chunk_size, where, params=params,
+                                                          **self.sketch.sketch_options))
+            else:
+                print(f"表 '{self.table_name}' 自上次统计（{watermark_column} = {old_watermark}）以来没有新数据")
+                new_watermark = old_watermark
+            if null_rows != counted_null_rows:
+                print(f"警告: 水位列 {watermark_column} 为 NULL 的行数由 {counted_null_rows} 变为 {null_rows}，"
+                      f"这些行无法增量统计，变化未计入结果；请删除 {state_file} 重新全量统计")
+
+        self.incremental_info = {
+            'watermark_column': watermark_column,
+            'previous': old_watermark,
+            'current': new_watermark,
+            'previous_run': state['saved_at'] if state else None,
+            'previous_rows': state['summary']['row_count'] if state else 0,
+            'null_rows': counted_null_rows,
+            'null_rows_now': null_rows,
+        }
+        self.save_sketch_state(state_file, watermark_column, new_watermark, top_n, counted_null_rows)
+        print(f"流式统计完成，共 {self.sketch.row_count} 条记录")
+        return True
+
+    def analyze_sketch_drift(self, mean_shift_threshold=0.5, missing_rate_threshold=0.05):
+        """
+        与上次运行的统计快照比较，输出各列的变化
+
+        均值变化超过上次标准差的 mean_shift_threshold 倍、缺失率变化超过 missing_rate_threshold、
+        或频繁值中出现新值时标记为“显著变化”
+        """
+        if self.sketch is None or self.baseline_summary is None:
+            print("没有上次运行的统计结果，跳过漂移分析")
+            return
+
+        previous = self.baseline_summary
+        current = self.sketch.summary()
+        info = self.incremental_info or {}
+
+        self.report.append("=== 与上次运行的对比（漂移分析） ===")
+        if info.get('previous_run'):
+            self.report.append(f"上次运行时间: {info['previous_run'].strftime('%Y-%m-%d %H:%M:%S')}")
+        self.report.append(f"记录数: {previous['row_count']} -> {current['row_count']} "
+                           f"(新增 {current['row_count'] - previous['row_count']})")
+
+        added = [col for col in current['columns'] if col not in previous['columns']]
+        removed = [col for col in previous['columns'] if col not in current['columns']]
+        if added:
+            self.report.append(f"新增列: {', '.join(added)}")
+        if removed:
+            self.report.append(f"删除列: {', '.join(removed)}")
+        self.report.append("")
+
+        for col, now in current['columns'].items():
+            before = previous['columns'].get(col)
+            if before is None or not before['total'] or not now['total']:
+                continue
+
+            changes = []
+            flagged = False
+            missing_before = before['missing'] / before['total']
+            missing_now = now['missing'] / now['total']
+            if abs(missing_now - missing_before) > 1e-9:
+                changes.append(f"缺失率: {missing_before * 100:.2f}% -> {missing_now * 100:.2f}%")
+                flagged |= abs(missing_now - missing_before) > missing_rate_threshold
+            if now['distinct'] != before['distinct']:
+                changes.append(f"唯一值数（估计）: {before['distinct']} -> {now['distinct']}")
+            if 'mean' in now and 'mean' in before:
+                if now['mean'] != before['mean']:
+                    shift = now['mean'] - before['mean']
+                    shift_desc = f"平均值: {before['mean']:.4f} -> {now['mean']:.4f}"
+                    if before['std'] and not np.isnan(before['std']):
+                        shift_desc += f" (变化 {shift / before['std']:+.2f} 个标准差)"
+                        flagged |= abs(shift) > mean_shift_threshold * before['std']
+                    changes.append(shift_desc)
+                if now['std'] != before['std']:
+                    changes.append(f"标准差: {before['std']:.4f} -> {now['std']:.4f}")
+                if now['median'] != before['median']:
+                    changes.append(f"中位数（估计）: {before['median']} -> {now['median']}")
+            new_top = [value for value, _ in now['top'] if value not in {v for v, _ in before['top']}]
+            if new_top:
+                changes.append(f"新进入频繁值的值: {', '.join(repr(value) for value in new_top)}")
+                flagged = True
+
+            if changes:
+                self.report.append(f"列名: {col}{'（显著变化）' if flagged else ''}")
+                for change in changes:
+                    self.report.append(f"  {change}")
+                self.report.append("")
+
+    def analyze_sketch_statistics(self, top_n=10):
+        """根据 self.sketch 输出各列的近似统计（唯一值、分位数、异常值、频繁值为估计值）"""
+        if self.sketch is None or not self.sketch.row_count:
+            print("没有流式统计结果可供分析")
+            return
+
+        self.report.append("=== 流式统计分析（草图估计） ===")
+
+        for col, sketch in self.sketch.columns.items():
+            total = sketch.total
+            self.report.append(f"列名: {col}")
+            self.report.append(f"  总记录数: {total}")
+            self.report.append(f"  缺失值数: {sketch.missing} ({sketch.missing / total * 100:.2f}%)")
+            distinct = sketch.distinct.estimate()
+            self.report.append(f"  唯一值数（估计）: {distinct} ({distinct / total * 100:.2f}%)")
+
+            count = total - sketch.missing
+            if not count:
+                self.report.append("  所有值均为缺失值")
+                self.report.append("")
+                continue
+
+            if sketch.is_numeric:
+                moments = sketch.moments
+                self.report.append(f"  数值范围: {moments.min} ~ {moments.max}")
+                self.report.append(f"  平均值: {moments.mean:.4f}")
+                self.report.append(f"  标准差: {moments.std():.4f}")
+                q1, median, q3 = sketch.quantiles.quantiles([0.25, 0.5, 0.75])
+                iqr = q3 - q1
+                self.report.append(f"  中位数（估计）: {median}")
+                self.report.append(f"  四分位数（估计）: Q1={q1}, Q3={q3}, IQR={iqr}")
+                outliers = sketch.quantiles.count_outside(q1 - 1.5 * iqr, q3 + 1.5 * iqr)
+                self.report.append(f"  异常值数量（估计）: {outliers} ({outliers / count * 100:.2f}%)")
+                self.report.append(f"  偏度: {moments.skew():.4f}")
+                self.report.append(f"  峰度: {moments.kurt():.4f}")
+
+            if sketch.frequent.approximate:
+                label = f"最频繁出现的值（次数为下界估计，每个值最多少计 {sketch.frequent.error} 次，按频率降序）:"
+            else:
+                label = "唯一值分布 (按频率降序):"
+            self.report.append(f"  {label}")
+            for value, value_count in sketch.frequent.top(top_n):
+                self.report.append(f"    '{value}': 出现 {value_count} 次 ({value_count / count * 100:.2f}%)")
+            self.report.append("")
+
     def analyze_column_data_types(self):
         """分析列的实际数据类型"""
         if self.data is None or self.data.empty:
@@ -104,6 +557,42 @@ class MySQLTableAnalyzer:
             self.report.append(f"  实际推断类型: {inferred_type}")
             self.report.append("")
 
+    # 类型推断先在前 TYPE_SAMPLE_SIZE 个非空值上判断，样本全部符合时才检查整列
+    TYPE_SAMPLE_SIZE = 1000
+
+    # 身份证号码、手机号码、邮箱地址、URL 的格式互斥：一个值最多符合其中一种
+    SEMANTIC_PATTERNS = {
+        "身份证号码": re.compile(r'^\d{17}[\dXx]$'),
+        "手机号码": re.compile(r'^1[3-9]\d{9}$'),
+        "邮箱地址": re.compile(r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'),
+        "URL": re.compile(r'^https?://(?:www\.)?[^\s/$.?#].[^\s]*$'),
+    }
+    # 一次匹配得到第一个值可能的语义类型
+    SEMANTIC_CLASSIFIER = re.compile('|'.join(
+        f"(?P<t{index}>{pattern.pattern})" for index, pattern in enumerate(SEMANTIC_PATTERNS.values())))
+
+    # 唯一值达到该数量即不可能是布尔或分类类型，不再继续统计
+    CATEGORY_MAX_UNIQUE = 50
+
+    def _all_values(self, series, predicate):
+        """先检查样本，样本全部符合再检查其余值；遇到第一个不符合的值立即返回 False
+
+        值在检查时才转换为字符串：样本之外的值只有样本全部符合时才会被转换
+        """
+        sample_size = self.TYPE_SAMPLE_SIZE
+        if not all(predicate(str(v)) for v in series.iloc[:sample_size].tolist()):
+            return False
+        return all(predicate(str(v)) for v in series.iloc[sample_size:])
+
+    def _distinct_values(self, series):
+        """返回列中的唯一值集合；唯一值达到 CATEGORY_MAX_UNIQUE 个时提前停止并返回 None"""
+        distinct = set()
+        for value in series:
+            distinct.add(value)
+            if len(distinct) >= self.CATEGORY_MAX_UNIQUE:
+                return None
+        return distinct
+
     def _infer_data_type(self, series):
         """推断Series的数据类型"""
         # 处理缺失值
@@ -119,46 +608,37 @@ class MySQLTableAnalyzer:
             else:
                 return "浮点数"
 
-        # 检查是否为日期时间类型
+        # 检查是否为日期时间类型：样本能解析时再解析整列
         try:
-            pd.to_datetime(non_null, errors='raise')
+            pd.to_datetime(non_null.iloc[:self.TYPE_SAMPLE_SIZE], errors='raise')
+            if len(non_null) > self.TYPE_SAMPLE_SIZE:
+                pd.to_datetime(non_null, errors='raise')
             return "日期时间"
         except (TypeError, ValueError):
             pass
 
-        # 检查是否为布尔类型
-        unique_values = non_null.unique()
-        if set(unique_values).issubset({True, False, 1, 0}):
-            return "布尔值"
-
-        # 检查是否为分类类型
-        if len(unique_values) < 0.1 * len(non_null) and len(unique_values) < 50:
-            return f"分类 (唯一值数: {len(unique_values)})"
-
-        # 检查是否为身份证号码
-        if all(non_null.astype(str).str.match(r'^\d{17}[\dXx]$')):
-            return "身份证号码"
-
-        # 检查是否为手机号码
-        if all(non_null.astype(str).str.match(r'^1[3-9]\d{9}$')):
-            return "手机号码"
-
-        # 检查是否为邮箱地址
-        email_pattern = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-        if all(non_null.astype(str).str.match(email_pattern)):
-            return "邮箱地址"
-
-        # 检查是否为URL
-        url_pattern = r'^https?://(?:www\.)?[^\s/$.?#].[^\s]*$'
-        if all(non_null.astype(str).str.match(url_pattern)):
-            return "URL"
+        # 布尔和分类类型的唯一值都少于 CATEGORY_MAX_UNIQUE 个，唯一值多的列扫描几十个值即可排除
+        unique_values = self._distinct_values(non_null)
+        if unique_values is not None:
+            # 检查是否为布尔类型
+            if unique_values.issubset({True, False, 1, 0}):
+                return "布尔值"
+
+            # 检查是否为分类类型
+            if len(unique_values) < 0.1 * len(non_null):
+                return f"分类 (唯一值数: {len(unique_values)})"
+
+        # 检查是否为身份证号码 / 手机号码 / 邮箱地址 / URL：只有第一个值符合的类型才可能整列都符合
+        match = self.SEMANTIC_CLASSIFIER.match(str(non_null.iloc[0]))
+        if match:
+            semantic_type = list(self.SEMANTIC_PATTERNS)[int(match.lastgroup[1:])]
+            pattern = self.SEMANTIC_PATTERNS[semantic_type]
+            if self._all_values(non_null, pattern.match):
+                return semantic_type
 
         # 检查是否为JSON字符串
-        try:
-            if all(non_null.astype(str).apply(lambda x: self._is_json(x))):
-                return "JSON字符串"
-        except:
-            pass
+        if self._all_values(non_null, self._is_json):
+            return "JSON字符串"
 
         # 默认返回字符串
         return "字符串"
@@ -166,12 +646,98 @@ class MySQLTableAnalyzer:
     def _is_json(self, s):
         """检查字符串是否为JSON格式"""
         try:
-            import json
             json.loads(s)
             return True
         except (json.JSONDecodeError, TypeError):
             return False
 
+    def get_column_stats(self, col):
+        """返回列的统计结果（只计算一次，各分析方法共用）"""
+        if self._column_stats_data is not self.data:
+            self._column_stats = {}
+            self._column_stats_data = self.data
+        if col not in self._column_stats:
+            self._column_stats[col] = self._compute_column_stats(self.data[col])
+        return self._column_stats[col]
+
+    @staticmethod
+    def _compute_column_stats(series):
+        """
+        计算一列的全部统计量：总数、缺失值、唯一值、各值频率，数值列另有最值、均值、标准差、分位数、偏度、峰度和异常值数
+
+        与 pandas 的 mean/std/median/quantile/skew/kurt 结果一致，但共用同一次 dropna 和去均值的结果
+        """
+        non_null = series.dropna()
+        value_counts = non_null.value_counts()
+        column_stats = {
+            'dtype': series.dtype,
+            'total': len(series),
+            'missing': len(series) - len(non_null),
+            'non_null': non_null,
+            'count': len(non_null),
+            'unique': len(value_counts),
+            'value_counts': value_counts,
+            'is_numeric': pd.api.types.is_numeric_dtype(series.dtype),
+        }
+        if not column_stats['is_numeric'] or non_null.empty:
+            return column_stats
+
+        values = non_null.to_numpy()
+        arr = values.astype(np.float64)
+        n = len(arr)
+        mean = arr.mean()
+        adjusted = arr - mean
+        adjusted2 = adjusted * adjusted
+        m2 = adjusted2.sum()
+        m3 = (adjusted2 * adjusted).sum()
+        m4 = (adjusted2 * adjusted2).sum()
+        q1, q3 = np.quantile(arr, [0.25, 0.75])
+        iqr = q3 - q1
+        lower_bound = q1 - 1.5 * iqr
+        upper_bound = q3 + 1.5 * iqr
+
+        column_stats.update({
+            'min': values.min(),
+            'max': values.max(),
+            'mean': mean,
+            'median': np.median(arr),
+            'std': np.sqrt(m2 / (n - 1)) if n > 1 else np.nan,
+            'q1': q1,
+            'q3': q3,
+            'iqr': iqr,
+            'outliers': int(((arr < lower_bound) | (arr > upper_bound)).sum()),
+            'skew': MySQLTableAnalyzer._skew(n, m2, m3),
+            'kurt': MySQLTableAnalyzer._kurt(n, m2, m4),
+        })
+        return column_stats
+
+    @staticmethod
+    def _zero_out_fperr(value):
+        return 0 if abs(value) < 1e-14 else value
+
+    @staticmethod
+    def _skew(n, m2, m3):
+        """样本偏度（与 pandas Series.skew 相同的无偏公式），m2/m3 为二、三阶中心矩之和"""
+        if n < 3:
+            return np.nan
+        m2 = MySQLTableAnalyzer._zero_out_fperr(m2)
+        m3 = MySQLTableAnalyzer._zero_out_fperr(m3)
+        if m2 == 0:
+            return 0.0
+        return (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / m2 ** 1.5)
+
+    @staticmethod
+    def _kurt(n, m2, m4):
+        """样本超额峰度（与 pandas Series.kurt 相同的无偏公式），m2/m4 为二、四阶中心矩之和"""
+        if n < 4:
+            return np.nan
+        adj = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        numerator = MySQLTableAnalyzer._zero_out_fperr(n * (n + 1) * (n - 1) * m4)
+        denominator = MySQLTableAnalyzer._zero_out_fperr((n - 2) * (n - 3) * m2 ** 2)
+        if denominator == 0:
+            return 0.0
+        return numerator / denominator - adj
+
     def analyze_column_distribution(self, max_unique_values=20):
         """分析列的数据分布"""
         if self.data is None or self.data.empty:
@@ -184,16 +750,17 @@ class MySQLTableAnalyzer:
             self.report.append(f"列名: {col}")
 
             # 基本统计信息
-            missing_count = self.data[col].isna().sum()
-            unique_count = self.data[col].nunique()
-            total_count = len(self.data)
+            column_stats = self.get_column_stats(col)
+            missing_count = column_stats['missing']
+            unique_count = column_stats['unique']
+            total_count = column_stats['total']
 
             self.report.append(f"  总记录数: {total_count}")
             self.report.append(f"  缺失值数: {missing_count} ({missing_count / total_count * 100:.2f}%)")
             self.report.append(f"  唯一值数: {unique_count} ({unique_count / total_count * 100:.2f}%)")
 
             # 根据数据类型进行不同的分析
-            dtype = self.data[col].dtype
+            dtype = column_stats['dtype']
 
             if pd.api.types.is_numeric_dtype(dtype):
                 # 数值类型分析
@@ -209,53 +776,43 @@ class MySQLTableAnalyzer:
 
     def _analyze_numeric_column(self, col):
         """分析数值类型列"""
-        series = self.data[col].dropna()
+        column_stats = self.get_column_stats(col)
+        count = column_stats['count']
 
         # 基本统计量
-        min_val = series.min()
-        max_val = series.max()
-        mean_val = series.mean()
-        median_val = series.median()
-        std_dev = series.std()
-
-        self.report.append(f"  数值范围: {min_val} ~ {max_val}")
-        self.report.append(f"  平均值: {mean_val:.4f}")
-        self.report.append(f"  中位数: {median_val}")
-        self.report.append(f"  标准差: {std_dev:.4f}")
+        self.report.append(f"  数值范围: {column_stats.get('min', np.nan)} ~ {column_stats.get('max', np.nan)}")
+        self.report.append(f"  平均值: {column_stats.get('mean', np.nan):.4f}")
+        self.report.append(f"  中位数: {column_stats.get('median', np.nan)}")
+        self.report.append(f"  标准差: {column_stats.get('std', np.nan):.4f}")
 
         # 分位数
-        q1, q3 = series.quantile([0.25, 0.75])
-        iqr = q3 - q1
+        q1, q3, iqr = column_stats.get('q1', np.nan), column_stats.get('q3', np.nan), column_stats.get('iqr', np.nan)
         self.report.append(f"  四分位数: Q1={q1}, Q3={q3}, IQR={iqr}")
 
         # 异常值检测
-        lower_bound = q1 - 1.5 * iqr
-        upper_bound = q3 + 1.5 * iqr
-        outliers = series[(series < lower_bound) | (series > upper_bound)]
-        self.report.append(f"  异常值数量: {len(outliers)} ({len(outliers) / len(series) * 100:.2f}%)")
+        outliers = column_stats.get('outliers', 0)
+        self.report.append(f"  异常值数量: {outliers} ({outliers / count * 100 if count else np.nan:.2f}%)")
 
         # 分布分析
-        unique_values = series.nunique()
+        unique_values = column_stats['unique']
         if unique_values <= 10:
             # 唯一值较少时显示全量分布
             self.report.append("  唯一值分布 (按频率降序):")
-            for value, count in series.value_counts().items():
-                self.report.append(f"    值 {value}: 出现 {count} 次 ({count / len(series) * 100:.2f}%)")
+            for value, value_count in column_stats['value_counts'].items():
+                self.report.append(f"    值 {value}: 出现 {value_count} 次 ({value_count / count * 100:.2f}%)")
         else:
             # 唯一值较多时显示频率最高的几个
             self.report.append("  最频繁出现的值 (按频率降序):")
-            for value, count in series.value_counts().head(10).items():
-                self.report.append(f"    值 {value}: 出现 {count} 次 ({count / len(series) * 100:.2f}%)")
+            for value, value_count in column_stats['value_counts'].head(10).items():
+                self.report.append(f"    值 {value}: 出现 {value_count} 次 ({value_count / count * 100:.2f}%)")
 
         # 偏度和峰度
-        skewness = series.skew()
-        kurtosis = series.kurt()
-        self.report.append(f"  偏度: {skewness:.4f}")
-        self.report.append(f"  峰度: {kurtosis:.4f}")
+        self.report.append(f"  偏度: {column_stats.get('skew', np.nan):.4f}")
+        self.report.append(f"  峰度: {column_stats.get('kurt', np.nan):.4f}")
 
     def _analyze_datetime_column(self, col):
         """分析日期时间类型列"""
-        series = self.data[col].dropna()
+        series = self.get_column_stats(col)['non_null']
 
         # 基本统计量
         min_date = series.min()
@@ -295,8 +852,9 @@ class MySQLTableAnalyzer:
 
     def _analyze_categorical_column(self, col, max_unique_values=20):
         """分析分类类型列"""
-        series = self.data[col].dropna()
-        unique_values = series.nunique()
+        column_stats = self.get_column_stats(col)
+        series = column_stats['non_null']
+        unique_values = column_stats['unique']
 
         if unique_values == 0:
             self.report.append("  所有值均为缺失值")
@@ -308,7 +866,7 @@ class MySQLTableAnalyzer:
             return
 
         # 计算频率分布
-        value_counts = series.value_counts(normalize=True) * 100
+        value_counts = column_stats['value_counts'] / column_stats['count'] * 100
 
         if unique_values <= max_unique_values:
             # 唯一值较少时显示全量分布
@@ -333,9 +891,11 @@ class MySQLTableAnalyzer:
 
         self.report.append("=== 数据质量分析 ===")
 
+        column_stats = {col: self.get_column_stats(col) for col in self.data.columns}
+
         # 整体缺失情况
         total_cells = self.data.size
-        missing_cells = self.data.isna().sum().sum()
+        missing_cells = sum(col_stats['missing'] for col_stats in column_stats.values())
         missing_percentage = missing_cells / total_cells * 100
 
         self.report.append(f"总单元格数: {total_cells}")
@@ -343,7 +903,9 @@ class MySQLTableAnalyzer:
 
         # 各列缺失情况
         self.report.append("\n各列缺失情况:")
-        missing_stats = self.data.isna().mean().sort_values(ascending=False) * 100
+        missing_stats = pd.Series({col: col_stats['missing'] / col_stats['total']
+                                   for col, col_stats in column_stats.items()},
+                                  dtype=float).sort_values(ascending=False) * 100
         for col, pct in missing_stats.items():
             if pct > 0:
                 self.report.append(f"  {col}: {pct:.2f}% 缺失")
@@ -354,8 +916,8 @@ class MySQLTableAnalyzer:
 
         # 主键候选分析
         self.report.append("\n主键候选分析:")
-        for col in self.data.columns:
-            unique_ratio = self.data[col].nunique() / len(self.data)
+        for col, col_stats in column_stats.items():
+            unique_ratio = col_stats['unique'] / len(self.data)
             if unique_ratio >= 0.99:
                 self.report.append(f"  {col}: 唯一值比例 {unique_ratio * 100:.2f}%，可能是主键")
             elif unique_ratio >= 0.9:
@@ -366,55 +928,174 @@ class MySQLTableAnalyzer:
         # 异常值检测汇总
         self.report.append("\n数值列异常值检测:")
         for col in self.data.select_dtypes(include=[np.number]).columns:
-            series = self.data[col].dropna()
-            if len(series) < 10:  # 数据点太少不进行分析
+            col_stats = column_stats[col]
+            if col_stats['count'] < 10:  # 数据点太少不进行分析
                 continue
 
-            q1, q3 = series.quantile([0.25, 0.75])
-            iqr = q3 - q1
-            lower_bound = q1 - 1.5 * iqr
-            upper_bound = q3 + 1.5 * iqr
-            outliers = series[(series < lower_bound) | (series > upper_bound)]
+            outliers = col_stats['outliers']
+            if outliers > 0:
+                self.report.append(f"  {col}: {outliers} 个异常值 ({outliers / col_stats['count'] * 100:.2f}%)")
 
-            if len(outliers) > 0:
-                self.report.append(f"  {col}: {len(outliers)} 个异常值 ({len(outliers) / len(series) * 100:.2f}%)")
+    def fetch_correlation_stats(self, columns=None, chunk_size=100000):
+        """
+        用非缓冲游标分块读取数值列，累积皮尔逊相关的充分统计量，返回 CorrelationAccumulator
 
-    def analyze_correlations(self):
-        """分析列之间的相关性"""
-        if self.data is None or self.data.empty:
+        columns 为 None 时使用表结构中的整数和浮点列；不需要把整表读入 self.data
+        """
+        if not self.connection or not self.connection.is_connected():
+            if not self.connect():
+                return None
+        if columns is None:
+            if self.structure is None and not self.fetch_table_structure():
+                return None
+            columns = [row[0] for row in self.structure
+                       if base_sql_type(row[1]) in INTEGER_SQL_TYPES | FLOAT_SQL_TYPES]
+        if len(columns) < 2:
+            print("数值列不足，无法进行相关性分析")
+            return None
+
+        accumulator = CorrelationAccumulator(columns)
+        column_list = ", ".join(f"`{col}`" for col in columns)
+        cursor = self.connection.cursor(buffered=False)
+        try:
+            cursor.execute(f"SELECT {column_list} FROM {self.table_name}")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                chunk = pd.DataFrame.from_records(rows, columns=columns)
+                accumulator.update(chunk.apply(pd.to_numeric, errors='coerce'))
+        finally:
+            cursor.close()
+        return accumulator
+
+    def analyze_correlations(self, method='pearson', top_k=None, threshold=None, chunk_size=None,
+                             heatmap='full', max_heatmap_columns=50, accumulator=None):
+        """
+        分析列之间的相关性
+
+        默认与原来一致：DataFrame.corr() 计算全部数值列，逐对输出并绘制带标注的热力图。
+        列很多时可以：
+        - chunk_size: 按行分块累积充分统计量计算相关系数（method='spearman' 时先按列求秩）
+        - accumulator: 直接使用 fetch_correlation_stats 的结果，不需要 self.data
+        - top_k / threshold: 只输出绝对值最大的 top_k 对，或绝对值不小于 threshold 的对，按绝对值降序
+        - heatmap: 'full' 原样绘制，'clustered' 按层次聚类重排列顺序，None 不绘制；
+          列数超过 max_heatmap_columns 时只保留与其他列相关性最强的列，超过 30 列时不标注数值
+        """
+        if method not in ('pearson', 'spearman'):
+            raise ValueError(f"不支持的相关系数: {method}，可选 pearson、spearman")
+        if heatmap not in (None, 'full', 'clustered'):
+            raise ValueError(f"不支持的热力图方式: {heatmap}，可选 full、clustered、None")
+        if accumulator is not None and method != 'pearson':
+            raise ValueError("流式统计量只支持 pearson 相关系数")
+
+        if accumulator is None and (self.data is None or self.data.empty):
             print("没有数据可供分析")
             return
 
         self.report.append("=== 相关性分析 ===")
 
-        # 数值列之间的相关性
-        numeric_cols = self.data.select_dtypes(include=[np.number]).columns
+        if accumulator is not None:
+            numeric_cols = pd.Index(accumulator.columns)
+        else:
+            # 数值列之间的相关性
+            numeric_cols = self.data.select_dtypes(include=[np.number]).columns
         if len(numeric_cols) < 2:
             self.report.append("数值列不足，无法进行相关性分析")
             return
 
         # 计算相关系数矩阵
-        corr_matrix = self.data[numeric_cols].corr()
-
-        self.report.append("数值列皮尔逊相关系数:")
-        for i in range(len(numeric_cols)):
-            for j in range(i + 1, len(numeric_cols)):
-                col1 = numeric_cols[i]
-                col2 = numeric_cols[j]
-                corr = corr_matrix.loc[col1, col2]
+        if accumulator is not None:
+            corr_matrix = accumulator.corr()
+        elif chunk_size:
+            # 按列求秩后的皮尔逊相关即斯皮尔曼相关（有缺失值时秩按列计算，与 pandas 的成对求秩略有差异）
+            numeric_data = self.data[numeric_cols]
+            if method == 'spearman':
+                numeric_data = numeric_data.rank()
+            accumulator = CorrelationAccumulator(numeric_cols)
+            for start in range(0, len(numeric_data), chunk_size):
+                accumulator.update(numeric_data.iloc[start:start + chunk_size])
+            corr_matrix = accumulator.corr()
+        else:
+            corr_matrix = self.data[numeric_cols].corr(method=method)
+
+        method_name = '皮尔逊' if method == 'pearson' else '斯皮尔曼'
+        if top_k is None and threshold is None:
+            self.report.append(f"数值列{method_name}相关系数:")
+            for i in range(len(numeric_cols)):
+                for j in range(i + 1, len(numeric_cols)):
+                    col1 = numeric_cols[i]
+                    col2 = numeric_cols[j]
+                    corr = corr_matrix.loc[col1, col2]
+                    self.report.append(f"  {col1} 和 {col2}: {corr:.4f}")
+        else:
+            pairs = self._top_correlation_pairs(corr_matrix, top_k, threshold)
+            conditions = []
+            if threshold is not None:
+                conditions.append(f"|r| >= {threshold}")
+            if top_k is not None:
+                conditions.append(f"前 {top_k} 对")
+            self.report.append(f"数值列{method_name}相关系数（{'，'.join(conditions)}，共 {len(pairs)} 对）:")
+            for col1, col2, corr in pairs:
                 self.report.append(f"  {col1} 和 {col2}: {corr:.4f}")
 
         # 热力图生成（如果有matplotlib）
+        if heatmap is None:
+            return
         try:
-            plt.figure(figsize=(10, 8))
-            sns.heatmap(corr_matrix, annot=True, cmap='coolwarm', fmt='.2f')
+            plot_matrix = corr_matrix
+            if len(plot_matrix) > max_heatmap_columns:
+                # 只保留与其他列相关性最强的列
+                strength = plot_matrix.abs().where(~np.eye(len(plot_matrix), dtype=bool)).max().fillna(0)
+                keep = strength.sort_values(ascending=False, kind='mergesort').index[:max_heatmap_columns]
+                plot_matrix = plot_matrix.loc[keep, keep]
+            if heatmap == 'clustered':
+                plot_matrix = self._cluster_order(plot_matrix)
+
+            size = max(10, len(plot_matrix) * 0.25)
+            annotate = len(plot_matrix) <= 30
+            plt.figure(figsize=(size, size * 0.8))
+            sns.heatmap(plot_matrix, annot=annotate, cmap='coolwarm', fmt='.2f')
             plt.title('数值列相关性热力图')
             plt.tight_layout()
             plt.savefig(f"{self.table_name}_correlation_heatmap.png")
+            plt.close()
             self.report.append("\n已生成相关性热力图: correlation_heatmap.png")
+            if len(plot_matrix) < len(corr_matrix):
+                self.report.append(f"（热力图只包含相关性最强的 {len(plot_matrix)} / {len(corr_matrix)} 列）")
         except Exception as e:
             self.report.append(f"\n生成相关性热力图失败: {e}")
 
+    @staticmethod
+    def _top_correlation_pairs(corr_matrix, top_k=None, threshold=None):
+        """取上三角中绝对值最大的 top_k 对和/或绝对值不小于 threshold 的对，返回 [(列1, 列2, 相关系数)]"""
+        values = corr_matrix.to_numpy()
+        rows, cols = np.triu_indices(len(values), k=1)
+        corrs = values[rows, cols]
+        strength = np.abs(corrs)
+        valid = ~np.isnan(strength)
+        if threshold is not None:
+            valid &= strength >= threshold
+        candidates = np.flatnonzero(valid)
+        if top_k is not None and len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-strength[candidates], top_k - 1)[:top_k]]
+        # 按绝对值降序，相同时保持原来的列顺序
+        candidates = candidates[np.lexsort((candidates, -strength[candidates]))]
+        names = corr_matrix.columns
+        return [(names[rows[i]], names[cols[i]], corrs[i]) for i in candidates]
+
+    @staticmethod
+    def _cluster_order(corr_matrix):
+        """按 1 - |r| 距离做平均连接层次聚类，返回按叶子顺序重排的矩阵"""
+        from scipy.cluster import hierarchy
+        from scipy.spatial.distance import squareform
+
+        distance = 1 - corr_matrix.abs().fillna(0).to_numpy()
+        np.fill_diagonal(distance, 0)
+        distance = np.clip((distance + distance.T) / 2, 0, None)
+        order = hierarchy.leaves_list(hierarchy.linkage(squareform(distance, checks=False), method='average'))
+        return corr_matrix.iloc[order, order]
+
     def generate_report(self, output_file=None):
         """生成分析报告"""
         if not self.report:
@@ -425,9 +1106,28 @@ class MySQLTableAnalyzer:
         header = [
             f"MySQL表 '{self.table_name}' 分析报告",
             f"生成时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
-            f"数据记录数: {len(self.data) if self.data is not None else 0}",
-            "-" * 50
+            f"数据记录数: {len(self.data) if self.data is not None else (self.sketch.row_count if self.sketch else 0)}",
         ]
+        if self.incremental_info:
+            info = self.incremental_info
+            incremental_desc = f"增量统计: 水位列 {info['watermark_column']}，{info['previous']} -> {info['current']}，" \
+                               f"上次记录数 {info['previous_rows']}"
+            if info['null_rows_now'] != info['null_rows']:
+                incremental_desc += f"，水位列为 NULL 的行: 已统计 {info['null_rows']}，当前 {info['null_rows_now']}（差异未计入）"
+            elif info['null_rows']:
+                incremental_desc += f"，含水位列为 NULL 的行 {info['null_rows']}"
+            header.append(incremental_desc)
+        if self.sample_info:
+            sample_desc = f"抽样方式: {self.sample_info['method']}，请求抽样数: {self.sample_info['requested']}，" \
+                          f"实际抽样数: {self.sample_info['size']}"
+            if 'strata_column' in self.sample_info:
+                sample_desc += f"，分层列: {self.sample_info['strata_column']}"
+            if 'sample_key' in self.sample_info:
+                sample_desc += f"，抽样键: {self.sample_info['sample_key']}"
+            header.append(sample_desc)
+        else:
+            header.append("抽样方式: 全量数据")
+        header.append("-" * 50)
 
         full_report = "\n".join(header + self.report)
 
@@ -444,14 +1144,15 @@ class MySQLTableAnalyzer:
 
 
 if __name__ == "__main__":
-    # 配置数据库连接参数
+    # 配置数据库连接参数（见 db_session 的 dexp，可用配置文件或环境变量覆盖）
+    db_config = load_db_config('dexp')
     config = {
-        'host': '10.60.2.187',
-        'user': 'dexp',
-        'password': 'lopkaTBdq62Z',
-        'database': 'dexpdb',
+        'host': db_config['host'],
+        'user': db_config['user'],
+        'password': db_config['password'],
+        'database': db_config['database'],
         'table_name': 'dwd_htcl_process_extrusion_line_1',
-        'port': 9030  # 添加了端口参数
+        'port': db_config['port']
     }
 
     # 创建分析器实例
@@ -0,0 +1,50 @@
+#!/usr/bin/python
+# encoding: utf-8
+# 目录正文属性抽取：正则在导入时编译一次，不依赖数据库，可单独测试
+import re
+from collections import namedtuple
+
+# name: 属性名, value: 属性值, span: 值在（统一 JT/T 写法后的）正文中的 (start, end)，默认属性为 None
+PropertyMatch = namedtuple('PropertyMatch', ['name', 'value', 'span'])
+
+# 定义属性模式和对应名称，按优先级排列：同一属性名只取第一个命中的模式的第一次匹配
+PROPERTY_PATTERNS = [
+    (re.compile(r"分类编号[：:]\s*([A-Za-z0-9]+)"), "分类编号"),
+    (re.compile(r"值域[: ：]\s*([^，。；\n]*)"), "值域"),
+    # 匹配了按和按照，但是以按照命名
+    (re.compile(r"(?:按照|按) JT/T ([^，。；\n]*)"), "按照 JT/T"),
+    (re.compile(r"(?:按照|按)\s+(\d+(?:\.\s*\d+)+)"), "按照 JT/T"),
+    # 按照本标准的4. 4. 1. 3
+    (re.compile(r"按照本标准的[^\d]*(?P<number>\d+(?:\.\s*\d+)*)"), "按照本标准的"),
+    (re.compile(r"^见\s*([^，。；\n]*)"), "见"),  # 添加^锚定行首，\s*要求"见"后有空格
+    # 匹配"注：同 JT / T 697. 2—2014 的 4. 1. 1. 1"
+    (re.compile(r"注[:：]同\s*JT/T\s*(\d+(?:\.\s*\d+)*—\d+\s*的\s*\d+(?:\.\s*\d+)*)"), "注：同 JT/T"),
+    # 匹配[来源:JT/T 697.4—-2013,5.7.1.5.2]，处理空格、连字符和多点分隔，允许编号后有额外内容
+    (re.compile(r"\[来源[:：]JT/T\s*(\d+(?:\s*\.\s*\d+)*[—-]\d+,\s*\d+(?:\s*\.\s*\d+)*(?:,\s*[^\]]+)?)\]"), "来源：JT/T"),
+]
+
+# 定义默认属性（当正文为空时使用）
+DEFAULT_PROPERTIES = [
+    PropertyMatch("空", "空", None),
+    # 可以添加其他默认属性
+]
+
+
+def extract_properties(full_content, patterns=PROPERTY_PATTERNS):
+    """抽取正文中的属性，返回 PropertyMatch 列表，每个属性名最多一条"""
+    # 统一 JT/T 的写法后再匹配
+    full_content = full_content.replace('JT / T', 'JT/T')
+    if not full_content.strip():
+        return list(DEFAULT_PROPERTIES)
+
+    properties = []
+    found_names = set()
+    for pattern, property_name in patterns:
+        # 该属性名已命中，后续同名模式不再扫描
+        if property_name in found_names:
+            continue
+        match = pattern.search(full_content)
+        if match:
+            found_names.add(property_name)
+            properties.append(PropertyMatch(property_name, match.group(1).strip(), match.span(1)))
+    return properties
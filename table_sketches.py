@@ -0,0 +1,541 @@
+"""
+可合并的列统计草图（sketch），用于流式分析放不进内存的大表
+
+每个草图都可以分块更新，并且两个草图可以合并（merge），
+因此分块读取、按分区读取或多个并行任务各自得到的部分结果都能合并为整表的统计：
+- HyperLogLog：唯一值数量
+- KLLSketch：分位数、中位数、IQR 异常值数量
+- MisraGries：频率最高的值
+- MomentAccumulator：均值、标准差、偏度、峰度（分块计算中心矩后按 Chan/Pébay 公式合并，等价于 Welford）
+
+各草图的 to_state / from_state 与只含 JSON 类型的 dict 相互转换，用于保存增量统计状态（不使用 pickle，读取状态不会执行代码）
+"""
+import base64
+import datetime
+import decimal
+
+import numpy as np
+import pandas as pd
+
+
+def encode_value(value):
+    """把列中的值转换为可写入 JSON 的形式；JSON 没有的类型记为 {'type': 类型名, 'value': 文本}"""
+    if value is None or isinstance(value, (bool, str)):
+        return value
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)):
+        return float(value)
+    # pandas 的类型是 datetime 的子类，需要先判断
+    if isinstance(value, pd.Timestamp):
+        return {'type': 'Timestamp', 'value': value.isoformat()}
+    if isinstance(value, pd.Timedelta):
+        return {'type': 'Timedelta', 'value': int(value.value)}
+    if isinstance(value, datetime.datetime):
+        return {'type': 'datetime', 'value': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'type': 'date', 'value': value.isoformat()}
+    if isinstance(value, datetime.time):
+        return {'type': 'time', 'value': value.isoformat()}
+    if isinstance(value, datetime.timedelta):
+        return {'type': 'timedelta', 'value': [value.days, value.seconds, value.microseconds]}
+    if isinstance(value, decimal.Decimal):
+        return {'type': 'Decimal', 'value': str(value)}
+    if isinstance(value, (bytes, bytearray)):
+        return {'type': 'bytes', 'value': base64.b64encode(value).decode('ascii')}
+    raise TypeError(f"无法保存类型为 {type(value).__name__} 的值")
+
+
+def decode_value(value):
+    """encode_value 的逆操作"""
+    if not isinstance(value, dict):
+        return value
+    kind, raw = value['type'], value['value']
+    if kind == 'Timestamp':
+        return pd.Timestamp(raw)
+    if kind == 'Timedelta':
+        return pd.Timedelta(raw, unit='ns')
+    if kind == 'datetime':
+        return datetime.datetime.fromisoformat(raw)
+    if kind == 'date':
+        return datetime.date.fromisoformat(raw)
+    if kind == 'time':
+        return datetime.time.fromisoformat(raw)
+    if kind == 'timedelta':
+        return datetime.timedelta(days=raw[0], seconds=raw[1], microseconds=raw[2])
+    if kind == 'Decimal':
+        return decimal.Decimal(raw)
+    if kind == 'bytes':
+        return base64.b64decode(raw)
+    raise ValueError(f"未知的值类型: {kind}")
+
+
+def _encode_array(array):
+    return {'dtype': array.dtype.str, 'data': base64.b64encode(array.tobytes()).decode('ascii')}
+
+
+def _decode_array(state):
+    return np.frombuffer(base64.b64decode(state['data']), dtype=np.dtype(state['dtype'])).copy()
+
+
+def hash_values(values):
+    """把一组非空值映射为 uint64 哈希；数值统一转为 float64，避免不同块中 1 和 1.0 被当成不同的值"""
+    series = pd.Series(values)
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        series = series.astype(np.float64)
+    return pd.util.hash_pandas_object(series, index=False).to_numpy(dtype=np.uint64)
+
+
+class HyperLogLog:
+    """HyperLogLog 唯一值估计，2^p 个寄存器，相对误差约 1.04 / sqrt(2^p)"""
+
+    def __init__(self, p=14):
+        # 剩余的 64 - p 位需要能被 float64 精确表示，才能用 log2 求前导零
+        if not 11 <= p <= 18:
+            raise ValueError("p 必须在 11 到 18 之间")
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
+
+    def update(self, hashes):
+        if len(hashes) == 0:
+            return
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        width = 64 - self.p
+        index = (hashes >> np.uint64(width)).astype(np.int64)
+        rest = (hashes & np.uint64((1 << width) - 1)).astype(np.float64)
+        rank = np.full(len(hashes), width + 1, dtype=np.uint8)
+        nonzero = rest > 0
+        rank[nonzero] = (width - np.floor(np.log2(rest[nonzero]))).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        # 小基数时使用线性计数
+        if raw <= 2.5 * m and zeros:
+            return int(round(m * np.log(m / zeros)))
+        return int(round(raw))
+
+    def to_state(self):
+        return {'p': self.p, 'registers': _encode_array(self.registers)}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['p'])
+        sketch.registers = _decode_array(state['registers'])
+        return sketch
+
+
+class KLLSketch:
+    """
+    KLL 式分位数草图：每层最多 k 个值，超出时排序后隔一个取一个提升到上一层（权重翻倍）
+
+    内存约为 k * log2(n / k)，分位数的秩误差随 k 增大而减小
+    """
+
+    def __init__(self, k=2048, seed=None):
+        self.k = k
+        self.n = 0
+        self.levels = [np.empty(0, dtype=np.float64)]
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        self.levels[0] = np.concatenate([self.levels[0], values])
+        self.n += len(values)
+        self._compress()
+
+    def merge(self, other):
+        while len(self.levels) < len(other.levels):
+            self.levels.append(np.empty(0, dtype=np.float64))
+        for h, level in enumerate(other.levels):
+            self.levels[h] = np.concatenate([self.levels[h], level])
+        self.n += other.n
+        self._compress()
+        return self
+
+    def _compress(self):
+        h = 0
+        while h < len(self.levels):
+            level = self.levels[h]
+            if len(level) > self.k:
+                level = np.sort(level)
+                # 奇数个时留下一个不提升，保证总权重不变
+                keep = level[:1] if len(level) % 2 else level[:0]
+                level = level[len(keep):]
+                offset = int(self._rng.integers(2))
+                if h + 1 == len(self.levels):
+                    self.levels.append(np.empty(0, dtype=np.float64))
+                self.levels[h + 1] = np.concatenate([self.levels[h + 1], level[offset::2]])
+                self.levels[h] = keep
+            h += 1
+
+    def _weighted_items(self):
+        items = np.concatenate(self.levels)
+        weights = np.concatenate([np.full(len(level), 1 << h, dtype=np.float64)
+                                  for h, level in enumerate(self.levels)])
+        order = np.argsort(items, kind='mergesort')
+        return items[order], weights[order]
+
+    def quantiles(self, qs):
+        if self.n == 0:
+            return [np.nan for _ in qs]
+        items, weights = self._weighted_items()
+        cumulative = np.cumsum(weights)
+        total = cumulative[-1]
+        return [items[min(int(np.searchsorted(cumulative, q * total)), len(items) - 1)] for q in qs]
+
+    def count_outside(self, lower, upper):
+        """估计小于 lower 或大于 upper 的值的个数"""
+        if self.n == 0:
+            return 0
+        items, weights = self._weighted_items()
+        outside = weights[(items < lower) | (items > upper)].sum()
+        return int(round(outside * self.n / weights.sum()))
+
+    def to_state(self):
+        # 随机数发生器的状态也一并保存，恢复后继续压缩的结果与不中断时相同
+        return {'k': self.k, 'n': self.n, 'levels': [_encode_array(level) for level in self.levels],
+                'rng': self._rng.bit_generator.state}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['k'])
+        sketch.n = state['n']
+        sketch.levels = [_decode_array(level) for level in state['levels']]
+        sketch._rng.bit_generator.state = state['rng']
+        return sketch
+
+
+class MisraGries:
+    """Misra-Gries 频繁项摘要：最多保留 k 个计数器，每个值的计数误差不超过 n / (k + 1)"""
+
+    def __init__(self, k=1000):
+        self.k = k
+        self.counts = {}
+        # 是否做过扣减（之后的计数为下界估计）
+        self.approximate = False
+        # 各次扣减量之和：每个值的真实次数在 [计数, 计数 + error] 之间，且 error 不超过 n / (k + 1)
+        self.error = 0
+
+    def update(self, value_counts):
+        """value_counts 为 {值: 次数}（如 Series.value_counts() 的结果）"""
+        counts = self.counts
+        for value, count in value_counts.items():
+            counts[value] = counts.get(value, 0) + int(count)
+        self._prune()
+
+    def merge(self, other):
+        self.approximate = self.approximate or other.approximate
+        self.error += other.error
+        self.update(other.counts)
+        return self
+
+    def _prune(self):
+        if len(self.counts) <= self.k:
+            return
+        threshold = sorted(self.counts.values(), reverse=True)[self.k]
+        self.counts = {value: count - threshold for value, count in self.counts.items() if count > threshold}
+        self.approximate = True
+        self.error += threshold
+
+    def top(self, n):
+        return sorted(self.counts.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def to_state(self):
+        # 值不一定是字符串，不能作为 JSON 对象的键，按 [值, 次数] 列表保存（保持顺序）
+        return {'k': self.k, 'counts': [[encode_value(value), count] for value, count in self.counts.items()],
+                'approximate': self.approximate, 'error': self.error}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(state['k'])
+        sketch.counts = {decode_value(value): count for value, count in state['counts']}
+        sketch.approximate = state['approximate']
+        sketch.error = state['error']
+        return sketch
+
+
+class MomentAccumulator:
+    """计数、均值和二至四阶中心矩之和，可按块更新并合并"""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.m3 = 0.0
+        self.m4 = 0.0
+        self.min = None
+        self.max = None
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values) == 0:
+            return
+        chunk = MomentAccumulator()
+        chunk.n = len(values)
+        chunk.mean = values.mean()
+        adjusted = values - chunk.mean
+        adjusted2 = adjusted * adjusted
+        chunk.m2 = adjusted2.sum()
+        chunk.m3 = (adjusted2 * adjusted).sum()
+        chunk.m4 = (adjusted2 * adjusted2).sum()
+        chunk.min = values.min()
+        chunk.max = values.max()
+        self.merge(chunk)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        if self.n == 0:
+            self.__dict__.update(other.__dict__)
+            return self
+        na, nb = self.n, other.n
+        n = na + nb
+        delta = other.mean - self.mean
+        m2 = self.m2 + other.m2 + delta ** 2 * na * nb / n
+        m3 = (self.m3 + other.m3 + delta ** 3 * na * nb * (na - nb) / n ** 2
+              + 3 * delta * (na * other.m2 - nb * self.m2) / n)
+        m4 = (self.m4 + other.m4 + delta ** 4 * na * nb * (na * na - na * nb + nb * nb) / n ** 3
+              + 6 * delta ** 2 * (na * na * other.m2 + nb * nb * self.m2) / n ** 2
+              + 4 * delta * (na * other.m3 - nb * self.m3) / n)
+        self.n, self.m2, self.m3, self.m4 = n, m2, m3, m4
+        self.mean = self.mean + delta * nb / n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    def std(self):
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+    def skew(self):
+        """与 pandas Series.skew 相同的无偏样本偏度"""
+        n = self.n
+        if n < 3:
+            return np.nan
+        if abs(self.m2) < 1e-14:
+            return 0.0
+        m3 = 0 if abs(self.m3) < 1e-14 else self.m3
+        return (n * (n - 1) ** 0.5 / (n - 2)) * (m3 / self.m2 ** 1.5)
+
+    def kurt(self):
+        """与 pandas Series.kurt 相同的无偏样本超额峰度"""
+        n = self.n
+        if n < 4:
+            return np.nan
+        adj = 3 * (n - 1) ** 2 / ((n - 2) * (n - 3))
+        numerator = n * (n + 1) * (n - 1) * self.m4
+        denominator = (n - 2) * (n - 3) * self.m2 ** 2
+        if abs(denominator) < 1e-14:
+            return 0.0
+        return numerator / denominator - adj
+
+    STATE_FIELDS = ('mean', 'm2', 'm3', 'm4', 'min', 'max')
+
+    def to_state(self):
+        state = {'n': int(self.n)}
+        for name in self.STATE_FIELDS:
+            value = getattr(self, name)
+            state[name] = None if value is None else float(value)
+        return state
+
+    @classmethod
+    def from_state(cls, state):
+        moments = cls()
+        moments.n = state['n']
+        for name in cls.STATE_FIELDS:
+            setattr(moments, name, state[name])
+        return moments
+
+
+class ColumnSketch:
+    """单列的全部草图；数值列额外维护矩和分位数草图"""
+
+    def __init__(self, hll_p=14, kll_k=2048, top_k=1000):
+        self.total = 0
+        self.missing = 0
+        # 所有非空值都是数值时为 True；出现过非数值块后不再维护数值统计
+        self.is_numeric = None
+        self.distinct = HyperLogLog(hll_p)
+        self.frequent = MisraGries(top_k)
+        self.moments = MomentAccumulator()
+        self.quantiles = KLLSketch(kll_k)
+
+    def update(self, series):
+        non_null = series.dropna()
+        self.total += len(series)
+        self.missing += len(series) - len(non_null)
+        if non_null.empty:
+            return
+
+        numeric = pd.api.types.is_numeric_dtype(non_null.dtype) and not pd.api.types.is_bool_dtype(non_null.dtype)
+        self.is_numeric = numeric if self.is_numeric is None else (self.is_numeric and numeric)
+        self.distinct.update(hash_values(non_null))
+        self.frequent.update(non_null.value_counts(sort=False))
+        if self.is_numeric:
+            values = non_null.to_numpy(dtype=np.float64)
+            self.moments.update(values)
+            self.quantiles.update(values)
+
+    def merge(self, other):
+        self.total += other.total
+        self.missing += other.missing
+        if other.is_numeric is not None:
+            self.is_numeric = other.is_numeric if self.is_numeric is None else (self.is_numeric and other.is_numeric)
+        self.distinct.merge(other.distinct)
+        self.frequent.merge(other.frequent)
+        self.moments.merge(other.moments)
+        self.quantiles.merge(other.quantiles)
+        return self
+
+    def summary(self, top_n=10):
+        """当前统计的快照（普通 dict），用于保存后与下一次运行比较"""
+        count = self.total - self.missing
+        result = {
+            'total': self.total,
+            'missing': self.missing,
+            'distinct': self.distinct.estimate(),
+            'top': self.frequent.top(top_n),
+        }
+        if self.is_numeric and count:
+            result['mean'] = float(self.moments.mean)
+            result['std'] = float(self.moments.std())
+            result['median'] = float(self.quantiles.quantiles([0.5])[0])
+        return result
+
+    def to_state(self):
+        return {
+            'total': int(self.total),
+            'missing': int(self.missing),
+            'is_numeric': None if self.is_numeric is None else bool(self.is_numeric),
+            'distinct': self.distinct.to_state(),
+            'frequent': self.frequent.to_state(),
+            'moments': self.moments.to_state(),
+            'quantiles': self.quantiles.to_state(),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls.__new__(cls)
+        sketch.total = state['total']
+        sketch.missing = state['missing']
+        sketch.is_numeric = state['is_numeric']
+        sketch.distinct = HyperLogLog.from_state(state['distinct'])
+        sketch.frequent = MisraGries.from_state(state['frequent'])
+        sketch.moments = MomentAccumulator.from_state(state['moments'])
+        sketch.quantiles = KLLSketch.from_state(state['quantiles'])
+        return sketch
+
+
+class TableSketch:
+    """整表的草图：{列名: ColumnSketch}，按 DataFrame 分块更新，可与其他分区的结果合并"""
+
+    def __init__(self, **sketch_options):
+        self.sketch_options = sketch_options
+        self.columns = {}
+        self.row_count = 0
+
+    def update(self, df):
+        self.row_count += len(df)
+        for col in df.columns:
+            if col not in self.columns:
+                self.columns[col] = ColumnSketch(**self.sketch_options)
+            self.columns[col].update(df[col])
+
+    def merge(self, other):
+        self.row_count += other.row_count
+        for col, sketch in other.columns.items():
+            if col in self.columns:
+                self.columns[col].merge(sketch)
+            else:
+                self.columns[col] = sketch
+        return self
+
+    def summary(self, top_n=10):
+        return {'row_count': self.row_count,
+                'columns': {col: sketch.summary(top_n) for col, sketch in self.columns.items()}}
+
+    def to_state(self):
+        return {'sketch_options': self.sketch_options, 'row_count': int(self.row_count),
+                'columns': {col: sketch.to_state() for col, sketch in self.columns.items()}}
+
+    @classmethod
+    def from_state(cls, state):
+        sketch = cls(**state['sketch_options'])
+        sketch.row_count = state['row_count']
+        sketch.columns = {col: ColumnSketch.from_state(column) for col, column in state['columns'].items()}
+        return sketch
+
+
+class CorrelationAccumulator:
+    """
+    皮尔逊相关系数的充分统计量（成对非缺失的计数、和、平方和、乘积和），按块更新、可合并
+
+    与 DataFrame.corr() 一样按成对非缺失的行计算；为减小相消误差，各列先减去第一个块的均值
+    """
+
+    def __init__(self, columns):
+        self.columns = list(columns)
+        k = len(self.columns)
+        self.shift = None
+        self.n = np.zeros((k, k))
+        # sx[i, j]: 列 i 与列 j 都非缺失的行上，列 i 的和；sxx 同理为平方和
+        self.sx = np.zeros((k, k))
+        self.sxx = np.zeros((k, k))
+        self.sxy = np.zeros((k, k))
+
+    def update(self, df):
+        values = df[self.columns].to_numpy(dtype=np.float64, na_value=np.nan)
+        if len(values) == 0:
+            return
+        present = ~np.isnan(values)
+        if self.shift is None:
+            counts = present.sum(axis=0)
+            self.shift = np.where(counts > 0, np.nansum(values, axis=0) / np.maximum(counts, 1), 0.0)
+        mask = present.astype(np.float64)
+        centered = np.where(present, values - self.shift, 0.0)
+        self.n += mask.T @ mask
+        self.sx += centered.T @ mask
+        self.sxx += (centered * centered).T @ mask
+        self.sxy += centered.T @ centered
+
+    def merge(self, other):
+        if other.columns != self.columns:
+            raise ValueError("只能合并相同列的相关性统计")
+        if other.shift is None:
+            return self
+        if self.shift is None:
+            self.__dict__.update(other.__dict__)
+            return self
+        # 把 other 的统计量换算到 self 的平移量下：x - self.shift = (x - other.shift) + d
+        d = (other.shift - self.shift)[:, None]
+        sx = other.sx + d * other.n
+        self.sxx += other.sxx + 2 * d * other.sx + d * d * other.n
+        self.sxy += other.sxy + other.sx * d.T + d * other.sx.T + d * d.T * other.n
+        self.sx += sx
+        self.n += other.n
+        return self
+
+    def corr(self):
+        """返回相关系数矩阵（DataFrame），少于 2 个成对观测或方差为 0 的位置为 NaN"""
+        n = self.n
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = n * self.sxy - self.sx * self.sx.T
+            var_x = n * self.sxx - self.sx * self.sx
+            result = cov / np.sqrt(var_x * var_x.T)
+        result[(n < 2) | ~(var_x > 0) | ~(var_x.T > 0)] = np.nan
+        result = np.clip(result, -1.0, 1.0)
+        # 与 DataFrame.corr() 相同：对角线上有方差的列为 1
+        diagonal = np.diag_indices_from(result)
+        result[diagonal] = np.where(np.isnan(result[diagonal]), np.nan, 1.0)
+        return pd.DataFrame(result, index=self.columns, columns=self.columns)
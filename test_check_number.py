@@ -0,0 +1,87 @@
+import logging
+from collections import Counter
+
+import pytest
+
+import check_number
+from check_number import NumberingTable, parse_numbering, parse_numbering_table, validate_numbering
+
+DOC_A = '0b6f1c1e-5d4c-4a55-9a0e-0f3a4f1e2a01'
+DOC_B = '5f2d7a4c-1b3e-4c8d-8e6f-7a9b0c1d2e02'
+DOC_C = '9c8b7a6d-5e4f-4a3b-8c2d-1e0f9a8b7c03'
+
+# (document_id, document_name, catalog_name, inner_id)，按 document_id 排序
+ROWS = [
+    (DOC_A, '标准 第2部分：术语', '1 范围', 1),
+    (DOC_A, '标准 第2部分：术语', '1.1 总则', 2),
+    (DOC_A, '标准 第2部分：术语', '1.1.1 一', 3),
+    (DOC_A, '标准 第2部分：术语', '1.1.99999999999999999999 超长编号', 4),
+    (DOC_A, '标准 第2部分：术语', '1.1.4 四', 5),
+    (DOC_A, '标准 第2部分：术语', '1.1.4 四（重复）', 6),
+    (DOC_B, '标准 第1部分：总则', '无编号的行', 1),
+    (DOC_B, '标准 第1部分：总则', '2 要求', 2),
+    (DOC_B, '标准 第1部分：总则', '2.1 一般要求', 3),
+    (DOC_B, '标准 第1部分：总则', '2.1.1 一', 4),
+    (DOC_B, '标准 第1部分：总则', '2.1.99998 缺号', 5),
+    (DOC_B, '标准 第1部分：总则', '3.2.1 缺父编号', 6),
+    (DOC_C, '附录', '1 说明', 1),
+]
+
+# 只在某一种模式下出现的进度行
+MODE_SPECIFIC = ('开始获取', '成功获取', '解析完成', '开始验证', '并行验证', '流式验证', '共读取')
+
+
+def test_numbering_table_overflow_leaves_no_partial_record():
+    table = NumberingTable()
+    table.append(DOC_A, (1, 2, 10 ** 30))
+    table.append(DOC_A, (3,))
+    assert list(table) == [(DOC_A, (1, 2, 10 ** 30)), (DOC_A, (3,))]
+    assert table.slice(1, 2).number(0) == (3,)
+
+
+def test_parse_numbering_table_matches_parse_numbering():
+    dict_rows = [{'document_id': row[0], 'catalog_name': row[2]} for row in ROWS]
+    numbering, dict_errors = parse_numbering(dict_rows)
+    table, table_errors = parse_numbering_table(ROWS, 0, 2)
+
+    assert [str(error) for error in table_errors] == [str(error) for error in dict_errors]
+    assert list(table) == [(item['document_id'], item['number_tuple']) for item in numbering]
+    assert [str(error) for error in validate_numbering(table)] == \
+           [str(error) for error in validate_numbering(numbering)]
+
+
+def _run(caplog, monkeypatch, entry, **kwargs):
+    monkeypatch.setattr(check_number, 'iter_catalog_rows', lambda batch_size=1000: iter(ROWS))
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger=check_number.logger.name):
+        entry(**kwargs)
+    return [record.getMessage() for record in caplog.records]
+
+
+def _without_progress(messages):
+    return [message for message in messages if not any(marker in message for marker in MODE_SPECIFIC)]
+
+
+def test_serial_parallel_and_stream_report_the_same_errors(caplog, monkeypatch):
+    serial = _run(caplog, monkeypatch, check_number.main)
+    parallel = _run(caplog, monkeypatch, check_number.main, workers=2, docs_per_task=1)
+    stream = _run(caplog, monkeypatch, check_number.main_stream)
+
+    assert not any('程序执行失败' in message for message in serial + parallel + stream)
+    assert _without_progress(parallel) == _without_progress(serial)
+    # 流式模式按文档ID顺序输出，解析错误随文档输出，内容相同
+    assert Counter(_without_progress(stream)) == Counter(_without_progress(serial))
+
+    report = '\n'.join(serial)
+    assert 'PARSE004' not in report
+    assert '缺少：2–3, 5–99999999999999999998' in report
+    assert '缺少：2–99997' in report
+    assert '存在重复编号：[4]' in report
+    assert '父编号 (3, 2) 不存在' in report
+
+
+@pytest.mark.parametrize('workers', [None, 2])
+def test_main_orders_documents_by_part_number(caplog, monkeypatch, workers):
+    messages = _run(caplog, monkeypatch, check_number.main, workers=workers)
+    headers = [message for message in messages if '开始处理' in message]
+    assert [doc_id in header for doc_id, header in zip((DOC_B, DOC_A, DOC_C), headers)] == [True] * 3